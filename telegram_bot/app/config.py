@@ -31,3 +31,98 @@ QR_API_KEY = _get_env("QR_API_KEY", required=True)
 
 # Синхронизация: интервал обновления данных из Google Sheets в секундах (например, 300 сек = 5 минут)
 INTERVAL_SYNC = int(_get_env("INTERVAL_SYNC", "300"))
+# Адаптивный интервал: после изменений сокращается до SYNC_INTERVAL_MIN, пока данные
+# стабильны — растёт до SYNC_INTERVAL_MAX; при ошибках — экспоненциальная задержка
+# до SYNC_BACKOFF_MAX. Ко всем интервалам добавляется джиттер ±SYNC_JITTER
+SYNC_INTERVAL_MIN = float(_get_env("SYNC_INTERVAL_MIN", "60"))
+SYNC_INTERVAL_MAX = float(_get_env("SYNC_INTERVAL_MAX", "1800"))
+SYNC_BACKOFF_MAX = float(_get_env("SYNC_BACKOFF_MAX", "1800"))
+SYNC_JITTER = float(_get_env("SYNC_JITTER", "0.1"))
+
+# Загрузка CSV из Google Sheets: таймаут одного источника в секундах
+SHEETS_FETCH_TIMEOUT = float(_get_env("SHEETS_FETCH_TIMEOUT", "20"))
+# Базовый адрес выгрузки CSV: для нагрузочных прогонов подменяется локальной заглушкой
+SHEETS_EXPORT_BASE_URL = _get_env("SHEETS_EXPORT_BASE_URL", "https://docs.google.com/spreadsheets/d").rstrip("/")
+
+# Горячая перезагрузка fixed_roles.json, текстовых блоков и картинок:
+# период опроса mtime файлов в секундах (0 — выключено)
+CONTENT_RELOAD_INTERVAL = float(_get_env("CONTENT_RELOAD_INTERVAL", "2"))
+
+# Декодирование QR: пул воркеров ("process" или "thread"), число воркеров,
+# максимум задач в работе и таймаут одной задачи в секундах
+QR_DECODE_POOL = _get_env("QR_DECODE_POOL", "process").lower()
+QR_DECODE_WORKERS = int(_get_env("QR_DECODE_WORKERS", str(os.cpu_count() or 2)))
+QR_DECODE_QUEUE_SIZE = int(_get_env("QR_DECODE_QUEUE_SIZE", str(QR_DECODE_WORKERS * 4)))
+QR_DECODE_TIMEOUT = float(_get_env("QR_DECODE_TIMEOUT", "5"))
+# Каскад QR: минимальная короткая сторона рендиции, с которой начинаем распознавание
+QR_CASCADE_MIN_SIDE = int(_get_env("QR_CASCADE_MIN_SIDE", "320"))
+
+# Общий HTTP-клиент: размер пула соединений, keep-alive, DNS-кеш и таймауты (секунды)
+HTTP_POOL_LIMIT = int(_get_env("HTTP_POOL_LIMIT", "100"))
+HTTP_LIMIT_PER_HOST = int(_get_env("HTTP_LIMIT_PER_HOST", "20"))
+HTTP_DNS_CACHE_TTL = int(_get_env("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(_get_env("HTTP_KEEPALIVE_TIMEOUT", "60"))
+HTTP_TOTAL_TIMEOUT = float(_get_env("HTTP_TOTAL_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(_get_env("HTTP_CONNECT_TIMEOUT", "5"))
+
+# Пул соединений asyncpg: размер, ожидание свободного соединения (секунды)
+# и кеш подготовленных запросов на соединение.
+# Соединение закрывается после DB_POOL_MAX_QUERIES запросов или DB_POOL_MAX_INACTIVE_LIFETIME секунд простоя
+DB_POOL_MIN_SIZE = int(_get_env("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(_get_env("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT = float(_get_env("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+DB_STATEMENT_CACHE_SIZE = int(_get_env("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_POOL_MAX_QUERIES = int(_get_env("DB_POOL_MAX_QUERIES", "50000"))
+DB_POOL_MAX_INACTIVE_LIFETIME = float(_get_env("DB_POOL_MAX_INACTIVE_LIFETIME", "300"))
+
+# Кеш ответов API карт: время свежести (секунды) и максимальное число карт
+CARD_CACHE_TTL = float(_get_env("CARD_CACHE_TTL", "15"))
+CARD_CACHE_SIZE = int(_get_env("CARD_CACHE_SIZE", "1000"))
+
+# Кеш прав пользователей (запасной путь мимо снимка прав): размер LRU
+# и время жизни найденных и ненайденных пользователей в секундах.
+# Изменения прав приходят через LISTEN/NOTIFY, поэтому TTL может быть долгим
+AUTH_CACHE_SIZE = int(_get_env("AUTH_CACHE_SIZE", "5000"))
+AUTH_CACHE_TTL = float(_get_env("AUTH_CACHE_TTL", "3600"))
+AUTH_NEGATIVE_TTL = float(_get_env("AUTH_NEGATIVE_TTL", "60"))
+# Канал Postgres для оповещений об изменении прав и интервал проверки слушающего соединения
+AUTH_NOTIFY_CHANNEL = _get_env("AUTH_NOTIFY_CHANNEL", "pglb_auth_changed")
+AUTH_LISTENER_PING = float(_get_env("AUTH_LISTENER_PING", "30"))
+# Снимок прав на диске для тёплого старта: содержит ФИО и роли всех сотрудников,
+# поэтому по умолчанию лежит вне каталога с кодом (в Docker — смонтируйте том).
+# Снимок старше AUTH_SNAPSHOT_MAX_AGE секунд при старте не используется
+AUTH_SNAPSHOT_PATH = _get_env(
+    "AUTH_SNAPSHOT_PATH", os.path.join(os.path.expanduser("~"), ".cache", "pgb_bot", "auth_snapshot.json")
+)
+AUTH_SNAPSHOT_MAX_AGE = float(_get_env("AUTH_SNAPSHOT_MAX_AGE", "86400"))
+
+# Кеш результатов распознавания фото по file_unique_id (число записей)
+SCAN_RESULT_CACHE_SIZE = int(_get_env("SCAN_RESULT_CACHE_SIZE", "5000"))
+
+# Альбомы с QR: сколько секунд ждать следующего фото той же media group
+MEDIA_GROUP_WINDOW = float(_get_env("MEDIA_GROUP_WINDOW", "0.8"))
+
+# Планировщик сканов: сколько сканов (фото или альбомов) обрабатывается одновременно
+SCAN_MAX_CONCURRENT = int(_get_env("SCAN_MAX_CONCURRENT", "8"))
+
+# Движки распознавания QR по порядку приоритета ("pyzbar", "opencv"): запасной движок
+# пробуется, только если основной не нашёл f_persAcc. OpenCV подключается явно
+# (например, "pyzbar,opencv"): каждый запасной движок добавляет свой проход
+# по всем стадиям нераспознанного фото
+QR_DECODER_BACKENDS = tuple(
+    name.strip() for name in _get_env("QR_DECODER_BACKENDS", "pyzbar").split(",") if name.strip()
+)
+
+# API карт: таймаут одной попытки и общий срок на все попытки (секунды),
+# повторы с экспоненциальной задержкой и джиттером, доля повторов от запросов за минуту
+QR_API_TIMEOUT = float(_get_env("QR_API_TIMEOUT", "4"))
+QR_API_DEADLINE = float(_get_env("QR_API_DEADLINE", "10"))
+QR_API_MAX_RETRIES = int(_get_env("QR_API_MAX_RETRIES", "2"))
+QR_API_RETRY_RATIO = float(_get_env("QR_API_RETRY_RATIO", "0.2"))
+QR_API_BACKOFF_BASE = float(_get_env("QR_API_BACKOFF_BASE", "0.2"))
+QR_API_BACKOFF_CAP = float(_get_env("QR_API_BACKOFF_CAP", "2"))
+# Предохранитель: сколько ошибок подряд открывают его и через сколько секунд пробовать снова
+QR_API_BREAKER_THRESHOLD = int(_get_env("QR_API_BREAKER_THRESHOLD", "5"))
+QR_API_BREAKER_RECOVERY = float(_get_env("QR_API_BREAKER_RECOVERY", "30"))
+# Хеджирование: второй запрос, если первый дольше этого перцентиля латентности (0 — выключено)
+QR_API_HEDGE_PERCENTILE = float(_get_env("QR_API_HEDGE_PERCENTILE", "0.95"))
@@ -1,13 +1,28 @@
 # telegram_bot/app/main.py
+import time
 import asyncio
 import logging
 
+# Отсчёт холодного старта — до импорта aiogram, OpenCV и остальных зависимостей
+BOOT_STARTED = time.monotonic()
+
 from telegram_bot.core.dispatcher import bot, dispatcher
 from telegram_bot.core.router import setup_routers
+from telegram_bot.core.middlewares import FirstReplyMiddleware, startup_stats
 from telegram_bot.services.text_service import preload_text_blocks
 from telegram_bot.services.image_cache import preload_images
-from telegram_bot.services.sheets_cache import sync_users_to_db_async
-from telegram_bot.app.config import INTERVAL_SYNC
+from telegram_bot.services.content_watcher import start_content_watcher, stop_content_watcher
+from telegram_bot.services.sync_scheduler import sync_scheduler
+from telegram_bot.services.decode_executor import start_decode_executor, shutdown_decode_executor
+from telegram_bot.services.http_client import start_http_client, close_http_client
+from telegram_bot.services.database import init_db_pool, close_db_pool
+from telegram_bot.services.resilience import backoff_delay
+from telegram_bot.services.access_control import (
+    refresh_auth_snapshot,
+    load_persisted_auth_snapshot,
+    invalidate_users,
+)
+from telegram_bot.services.auth_notify import start_auth_listener, stop_auth_listener
 
 # Настройка базового логгирования
 logging.basicConfig(
@@ -17,31 +32,97 @@ logging.basicConfig(
 logger = logging.getLogger("PGB_BOT")
 
 
-async def background_sync():
-    """Фоновая задача для синхронизации данных из Google Sheets с базой."""
+async def reconcile_auth_snapshot():
+    """После тёплого старта сверяет снимок прав с диска с актуальной БД."""
+    try:
+        invalidate_users(await refresh_auth_snapshot())
+    except Exception as e:
+        logger.error(f"Не удалось сверить снимок прав с БД, работаем по снимку с диска: {e}")
+
+
+async def connect_db_in_background():
+    """
+    Тёплый старт без БД: бот уже отвечает по снимку с диска, а пул БД
+    поднимается с экспоненциальной задержкой; после подключения снимок сверяется с БД.
+    """
+    attempt = 0
     while True:
+        attempt += 1
+        await asyncio.sleep(backoff_delay(attempt, 1, 60))
         try:
-            logger.info("Начало синхронизации с Google Sheets...")
-            # Если force_reload=False, функция load_all_from_sheets сама решит, что делать, исходя из хэша.
-            await sync_users_to_db_async(force_reload=False)
-            logger.info("Синхронизация успешно завершена.")
+            await init_db_pool()
+            break
         except Exception as e:
-            logger.error(f"Ошибка синхронизации: {e}")
-        await asyncio.sleep(INTERVAL_SYNC)
+            logger.error(f"Пул БД всё ещё недоступен (попытка {attempt}): {e}")
+    logger.info("🗄️ Пул БД поднят после тёплого старта")
+    await reconcile_auth_snapshot()
 
 
 async def main():
     # Предзагружаем текстовые блоки и изображения
     await preload_text_blocks()
     await preload_images()
+    # Правки fixed_roles.json, text_blocks и img подхватываются без перезапуска
+    await start_content_watcher()
+
+    # Тёплый старт: снимок прав с диска читаем до подключения к БД, чтобы отвечать сразу
+    started = time.monotonic()
+    warm = await load_persisted_auth_snapshot()
+    if warm:
+        startup_stats["snapshot_source"] = "disk"
+        startup_stats["snapshot_load_ms"] = (time.monotonic() - started) * 1000
 
-    # Запускаем фоновое задание синхронизации
-    asyncio.create_task(background_sync())
+    # Поднимаем пул БД, пул декодирования QR и общий HTTP-клиент до первого апдейта.
+    # Со снимком на диске недоступная БД не мешает старту — пул поднимется в фоне
+    db_task = None
+    try:
+        await init_db_pool()
+    except Exception as e:
+        if not warm:
+            raise
+        logger.error(f"Не удалось подключиться к БД, работаем по снимку с диска: {e}")
+        db_task = asyncio.create_task(connect_db_in_background())
+    await start_decode_executor()
+    await start_http_client()
+
+    # Сверка снимка с БД идёт в фоне. Без снимка на диске строим его из БД
+    # до первого апдейта; без снимка вообще — авторизация через БД
+    if warm:
+        if db_task is None:
+            asyncio.create_task(reconcile_auth_snapshot())
+    else:
+        started = time.monotonic()
+        try:
+            await refresh_auth_snapshot()
+            startup_stats["snapshot_source"] = "db"
+        except Exception as e:
+            logger.error(f"Не удалось собрать снимок прав, авторизация через БД: {e}")
+        startup_stats["snapshot_load_ms"] = (time.monotonic() - started) * 1000
+    # Изменения прав из других процессов приходят через LISTEN/NOTIFY
+    await start_auth_listener()
+
+    # Запускаем фоновую синхронизацию: адаптивный интервал, одна реплика за раз
+    sync_task = asyncio.create_task(sync_scheduler.run_forever())
 
     # Настраиваем роутеры и запускаем опрос Telegram
+    dispatcher.update.outer_middleware(FirstReplyMiddleware(BOOT_STARTED))
     dispatcher.include_router(setup_routers())
-    logger.info("🚀 Бот запущен")
-    await dispatcher.start_polling(bot)
+    startup_stats["ready_seconds"] = time.monotonic() - BOOT_STARTED
+    logger.info(
+        f"🚀 Бот запущен за {startup_stats['ready_seconds']:.2f} с "
+        f"(снимок прав: {startup_stats['snapshot_source'] or 'нет'}, {startup_stats['snapshot_load_ms']:.1f} мс)"
+    )
+    try:
+        await dispatcher.start_polling(bot)
+    finally:
+        sync_task.cancel()
+        if db_task is not None:
+            db_task.cancel()
+        await stop_content_watcher()
+        await shutdown_decode_executor()
+        await close_http_client()
+        await stop_auth_listener()
+        await close_db_pool()
 
 
 if __name__ == "__main__":
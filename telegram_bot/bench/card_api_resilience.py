@@ -0,0 +1,129 @@
+# telegram_bot/bench/card_api_resilience.py
+"""
+Прогон слоя устойчивости API карт (предохранитель, бюджет повторов,
+хеджирование) против локальной заглушки fake_card_api.
+
+Сценарии: здоровый апстрим, медленный хвост, полное падение, восстановление.
+Для каждого печатается латентность на стороне клиента, доля успехов,
+состояние предохранителя и счётчики повторов/хеджей.
+
+Запуск:
+    python -m telegram_bot.bench.card_api_resilience --requests 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+async def _run_scenario(name: str, requests: int, concurrency: int) -> dict:
+    from telegram_bot.services.card_api import fetch_card_info, get_card_api_health
+
+    before = get_card_api_health()
+    latencies, successes = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal successes
+        async with semaphore:
+            started = time.perf_counter()
+            data = await fetch_card_info(str(1_000_000 + i))
+            latencies.append(time.perf_counter() - started)
+            successes += data is not None
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+
+    after = get_card_api_health()
+    return {
+        "scenario": name,
+        "requests": requests,
+        "success_rate": successes / requests,
+        "wall_seconds": wall,
+        "client_p50_ms": _percentile(latencies, 0.50) * 1000,
+        "client_p95_ms": _percentile(latencies, 0.95) * 1000,
+        "client_max_ms": max(latencies, default=0.0) * 1000,
+        "breaker_state": after["breaker"]["state"],
+        "breaker_rejected": after["breaker"]["rejected"] - before["breaker"]["rejected"],
+        "upstream_requests": after["requests"] - before["requests"],
+        "retries": after["retries"] - before["retries"],
+        "hedges": after["hedges"] - before["hedges"],
+        "hedge_wins": after["hedge_wins"] - before["hedge_wins"],
+    }
+
+
+async def run(requests: int, concurrency: int, recovery: float) -> list[dict]:
+    from telegram_bot.bench.fake_card_api import FakeApiBehaviour, create_app
+    from telegram_bot.services.http_client import close_http_client
+    from aiohttp import web
+
+    behaviour = FakeApiBehaviour(latency=0.02)
+    runner = web.AppRunner(create_app(behaviour))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", int(os.environ["_FAKE_CARD_API_PORT"])).start()
+
+    results = []
+    try:
+        results.append(await _run_scenario("healthy", requests, concurrency))
+
+        behaviour.slow_rate, behaviour.slow_latency = 0.1, 1.0
+        results.append(await _run_scenario("slow_tail", requests, concurrency))
+
+        behaviour.slow_rate, behaviour.error_rate = 0.0, 1.0
+        results.append(await _run_scenario("outage", requests, concurrency))
+
+        behaviour.error_rate = 0.0
+        await asyncio.sleep(recovery)
+        results.append(await _run_scenario("recovery", requests, concurrency))
+    finally:
+        await close_http_client()
+        await runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сценарии устойчивости API карт против заглушки")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--recovery", type=float, default=2.0, help="QR_API_BREAKER_RECOVERY, с")
+    parser.add_argument("--out", help="куда записать JSON-отчёт (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    # Конфигурация читается при импорте, поэтому окружение готовим до импорта card_api
+    port = _free_port()
+    os.environ["_FAKE_CARD_API_PORT"] = str(port)
+    os.environ["QR_API_URL"] = f"http://127.0.0.1:{port}/card"
+    os.environ.setdefault("QR_API_KEY", "bench")
+    os.environ["QR_API_BREAKER_RECOVERY"] = str(args.recovery)
+    for name in ("BOT_TOKEN", "SPREADSHEET_ID_OPERATORS", "SPREADSHEET_ID_CONSULTANTS",
+                 "SPREADSHEET_ID_PHONES", "SPREADSHEET_ID_OPERATORS_RENT"):
+        os.environ.setdefault(name, "bench")
+
+    results = asyncio.run(run(args.requests, args.concurrency, args.recovery))
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
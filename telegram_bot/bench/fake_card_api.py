@@ -0,0 +1,102 @@
+# telegram_bot/bench/fake_card_api.py
+"""
+Локальная заглушка API карт (QR_API_URL) для проверки устойчивости клиента.
+
+Отвечает тем же JSON, что и боевое API ({"Balance", "BalanceHistory"}),
+с настраиваемой задержкой, «хвостом» медленных ответов и долей ошибок.
+Поведение можно менять на лету: POST /_control с JSON тех же полей,
+например {"error_rate": 1.0}, чтобы сымитировать падение апстрима.
+
+Запуск:
+    python -m telegram_bot.bench.fake_card_api --port 8081 --latency 0.05
+    QR_API_URL=http://127.0.0.1:8081/card python -m telegram_bot.app.main
+"""
+
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass, asdict
+
+from aiohttp import web
+
+
+@dataclass
+class FakeApiBehaviour:
+    latency: float = 0.05        # базовая задержка ответа, с
+    slow_rate: float = 0.0       # доля медленных ответов
+    slow_latency: float = 3.0    # задержка медленного ответа, с
+    error_rate: float = 0.0      # доля ответов 503
+    api_key: str | None = None   # если задан — проверяем apikey
+
+
+def create_app(behaviour: FakeApiBehaviour | None = None) -> web.Application:
+    app = web.Application()
+    app["behaviour"] = behaviour or FakeApiBehaviour()
+    app["stats"] = {"requests": 0, "errors": 0, "slow": 0}
+
+    async def card(request: web.Request) -> web.Response:
+        b: FakeApiBehaviour = request.app["behaviour"]
+        stats = request.app["stats"]
+        stats["requests"] += 1
+
+        card_number = request.query.get("cardNumber")
+        if not card_number:
+            return web.json_response({"error": "cardNumber required"}, status=400)
+        if b.api_key is not None and request.query.get("apikey") != b.api_key:
+            return web.json_response({"error": "bad apikey"}, status=403)
+
+        delay = b.latency
+        if random.random() < b.slow_rate:
+            stats["slow"] += 1
+            delay = b.slow_latency
+        await asyncio.sleep(delay)
+
+        if random.random() < b.error_rate:
+            stats["errors"] += 1
+            return web.json_response({"error": "upstream unavailable"}, status=503)
+
+        seed = int(card_number) % 1000
+        return web.json_response({
+            "Balance": seed * 10,
+            "BalanceHistory": [
+                {"isReplenishment": True, "value": 500, "date": "2025-06-01 10:00", "parkObjectName": "Касса"},
+                {"isReplenishment": False, "value": 150, "date": "2025-06-01 12:30", "parkObjectName": "Колесо обозрения"},
+            ],
+        })
+
+    async def control(request: web.Request) -> web.Response:
+        b: FakeApiBehaviour = request.app["behaviour"]
+        if request.method == "POST":
+            for key, value in (await request.json()).items():
+                if hasattr(b, key):
+                    setattr(b, key, value)
+        return web.json_response({"behaviour": asdict(b), "stats": request.app["stats"]})
+
+    app.router.add_get("/card", card)
+    app.router.add_route("*", "/_control", control)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка API карт")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--api-key")
+    args = parser.parse_args()
+
+    behaviour = FakeApiBehaviour(
+        latency=args.latency,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+        error_rate=args.error_rate,
+        api_key=args.api_key,
+    )
+    web.run_app(create_app(behaviour), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
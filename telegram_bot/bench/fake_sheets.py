@@ -0,0 +1,216 @@
+# telegram_bot/bench/fake_sheets.py
+"""
+Локальная заглушка выгрузки Google Sheets (/<spreadsheet_id>/export?format=csv&gid=)
+для нагрузочных прогонов синхронизации ростера.
+
+Генерирует синтетические листы операторов, консультантов, телефонов и арендаторов
+заданного размера в тех же колонках, что читает sheets_cache, отдаёт их с ETag
+и отвечает 304 на If-None-Match. Изменения в ростер вносятся на лету:
+POST /_control с {"churn": 0.01} меняет роли, ФИО или состав у 1% людей,
+остальные поля — как у FakeSheetsBehaviour.
+
+Запуск:
+    python -m telegram_bot.bench.fake_sheets --port 8082 --size 5000
+    SHEETS_EXPORT_BASE_URL=http://127.0.0.1:8082 GID_OPERATORS=1 GID_CONSULTANTS=2 \\
+        GID_PHONES=3 GID_OPERATORS_RENT=4 python -m telegram_bot.services.sheets_cache
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import random
+from dataclasses import dataclass, asdict
+
+from aiohttp import web
+
+# GID листов заглушки — их же бенчмарк подставляет в GID_* окружения
+SHEET_GIDS = {"operators": 1, "consultants": 2, "phones": 3, "operators_rent": 4}
+
+
+@dataclass
+class Person:
+    index: int
+    full_name: str
+    username: str
+    operator: bool = False
+    consultant: bool = False
+    rent: bool = False      # арендатор: username берётся из листа арендаторов
+
+
+def _make_person(index: int, rng: random.Random) -> Person:
+    person = Person(index, f"Сотрудник{index} Тестовый{index} Отчество", f"bench_user{index}")
+    if rng.random() < 0.1:
+        person.rent = True
+    else:
+        person.operator = rng.random() < 0.6
+        person.consultant = not person.operator or rng.random() < 0.2
+    return person
+
+
+def generate_roster(size: int, rng: random.Random) -> list[Person]:
+    return [_make_person(i, rng) for i in range(size)]
+
+
+def apply_churn(people: list[Person], churn: float, rng: random.Random) -> int:
+    """
+    Меняет долю churn ростера: у 60% выбранных переключается роль,
+    у 20% меняется ФИО, 20% уходят и заменяются новыми людьми.
+
+    :return: сколько записей изменено
+    """
+    count = min(len(people), round(len(people) * churn))
+    next_index = max((p.index for p in people), default=-1) + 1
+    for position in rng.sample(range(len(people)), count):
+        person = people[position]
+        action = rng.random()
+        if action < 0.6 and not person.rent:
+            if rng.random() < 0.5:
+                person.operator = not person.operator
+            else:
+                person.consultant = not person.consultant
+        elif action < 0.8:
+            person.full_name = f"Сотрудник{person.index} Переименованный{rng.randrange(10**6)} Отчество"
+        else:
+            people[position] = _make_person(next_index, rng)
+            next_index += 1
+    return count
+
+
+def render_sheets(people: list[Person]) -> dict[str, bytes]:
+    """
+    Листы в колонках, которые разбирает sheets_cache: ФИО в первой колонке,
+    Telegram в третьей (телефоны) или четвёртой (арендаторы).
+    """
+    buffers = {name: io.StringIO() for name in SHEET_GIDS}
+    writers = {name: csv.writer(buffer, lineterminator="\r\n") for name, buffer in buffers.items()}
+    for p in people:
+        phone = f"+7900{p.index:07d}"
+        if p.rent:
+            writers["operators_rent"].writerow([p.full_name, phone, f"Павильон {p.index % 50}", f"@{p.username}"])
+            continue
+        writers["phones"].writerow([p.full_name, phone, f"@{p.username}"])
+        if p.operator:
+            writers["operators"].writerow([p.full_name, "смена"])
+        if p.consultant:
+            writers["consultants"].writerow([p.full_name, "зал"])
+    return {name: buffer.getvalue().encode("utf-8") for name, buffer in buffers.items()}
+
+
+@dataclass
+class FakeSheetsBehaviour:
+    size: int = 5000            # людей в ростере
+    seed: int = 42
+    latency: float = 0.0        # задержка перед ответом, с
+    error_rate: float = 0.0     # доля ответов 503
+    etag: bool = True           # отдавать ETag и отвечать 304
+
+
+class FakeSheets:
+    """Синтетический ростер и отрендеренные из него листы с ETag."""
+
+    def __init__(self, behaviour: FakeSheetsBehaviour):
+        self.behaviour = behaviour
+        self.rng = random.Random(behaviour.seed)
+        self.people = generate_roster(behaviour.size, self.rng)
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0, "bytes_sent": 0, "churned": 0}
+        self.render()
+
+    def render(self):
+        self.bodies = render_sheets(self.people)
+        self.etags = {name: f'"{hashlib.md5(body).hexdigest()}"' for name, body in self.bodies.items()}
+
+    def churn(self, fraction: float) -> int:
+        changed = apply_churn(self.people, fraction, self.rng)
+        self.stats["churned"] += changed
+        self.render()
+        return changed
+
+    def resize(self, size: int):
+        self.behaviour.size = size
+        self.people = generate_roster(size, self.rng)
+        self.render()
+
+    def describe(self) -> dict:
+        return {
+            "people": len(self.people),
+            "sheets": {
+                name: {"bytes": len(body), "rows": body.count(b"\n")}
+                for name, body in self.bodies.items()
+            },
+        }
+
+
+def create_app(sheets: FakeSheets) -> web.Application:
+    app = web.Application()
+    app["sheets"] = sheets
+    names_by_gid = {str(gid): name for name, gid in SHEET_GIDS.items()}
+
+    async def export(request: web.Request) -> web.Response:
+        s: FakeSheets = request.app["sheets"]
+        b = s.behaviour
+        s.stats["requests"] += 1
+        if request.query.get("format") != "csv":
+            return web.Response(status=400, text="format=csv required")
+        name = names_by_gid.get(request.query.get("gid", ""))
+        if name is None:
+            return web.Response(status=404, text="unknown gid")
+
+        if b.latency:
+            await asyncio.sleep(b.latency)
+        if random.random() < b.error_rate:
+            s.stats["errors"] += 1
+            return web.Response(status=503, text="unavailable")
+
+        etag = s.etags[name]
+        if b.etag and request.headers.get("If-None-Match") == etag:
+            s.stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+
+        body = s.bodies[name]
+        s.stats["bytes_sent"] += len(body)
+        headers = {"ETag": etag} if b.etag else {}
+        return web.Response(body=body, content_type="text/csv", charset="utf-8", headers=headers)
+
+    async def control(request: web.Request) -> web.Response:
+        s: FakeSheets = request.app["sheets"]
+        if request.method == "POST":
+            payload = await request.json()
+            if "size" in payload:
+                s.resize(int(payload.pop("size")))
+            if "churn" in payload:
+                s.churn(float(payload.pop("churn")))
+            for key, value in payload.items():
+                if hasattr(s.behaviour, key):
+                    setattr(s.behaviour, key, value)
+        return web.json_response({"behaviour": asdict(s.behaviour), "stats": s.stats, **s.describe()})
+
+    app.router.add_get("/{spreadsheet_id}/export", export)
+    app.router.add_route("*", "/_control", control)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка выгрузки Google Sheets")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--no-etag", action="store_true")
+    args = parser.parse_args()
+
+    behaviour = FakeSheetsBehaviour(
+        size=args.size,
+        seed=args.seed,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        etag=not args.no_etag,
+    )
+    web.run_app(create_app(FakeSheets(behaviour)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
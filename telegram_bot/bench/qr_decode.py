@@ -0,0 +1,294 @@
+# telegram_bot/bench/qr_decode.py
+"""
+Офлайн-бенчмарк распознавания QR.
+
+Генерирует синтетический корпус фото карт с QR-кодом (payload с f_persAcc=)
+в разных разрешениях, с размытием, поворотом, JPEG-сжатием и шумом, прогоняет
+по нему путь декодирования (cv2.imdecode + каскад движков + extract_card_number)
+и пишет JSON с латентностью, пропускной способностью, памятью и успешностью
+по стадиям.
+
+Запуск:
+    python -m telegram_bot.bench.qr_decode --out bench_qr.json
+    python -m telegram_bot.bench.qr_decode --baseline bench_qr.json --out new.json
+    python -m telegram_bot.bench.qr_decode --backends opencv --out bench_opencv.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from telegram_bot.services.qr_decode import decode_qr_cascade, extract_card_number, ALL_STAGES, BACKENDS
+
+RESOLUTIONS = (320, 800, 1280)       # длинная сторона кадра, px
+BLURS = (0, 3, 7)                    # ядро гауссова размытия (0 — без размытия)
+ROTATIONS = (0, 15, 40)              # угол поворота, градусы
+JPEG_QUALITIES = (90, 50, 20)
+NOISE_SIGMAS = (0, 10, 25)           # СКО гауссова шума
+
+
+def _make_card(payload: str, side: int, rng: random.Random) -> np.ndarray:
+    """
+    Рисует «фото карты»: светлый фон 4:3, QR примерно на треть кадра,
+    слегка смещённый от центра.
+    """
+    qr = cv2.QRCodeEncoder.create().encode(payload)
+    qr = cv2.copyMakeBorder(qr, 4, 4, 4, 4, cv2.BORDER_CONSTANT, value=255)
+
+    width, height = side, side * 3 // 4
+    canvas = np.full((height, width), rng.randint(190, 240), np.uint8)
+    qr_side = max(qr.shape[0], int(height * rng.uniform(0.3, 0.45)))
+    qr = cv2.resize(qr, (qr_side, qr_side), interpolation=cv2.INTER_NEAREST)
+
+    x = (width - qr_side) // 2 + rng.randint(-width // 10, width // 10)
+    y = (height - qr_side) // 2 + rng.randint(-height // 10, height // 10)
+    x, y = min(max(x, 0), width - qr_side), min(max(y, 0), height - qr_side)
+    canvas[y:y + qr_side, x:x + qr_side] = qr
+    return canvas
+
+
+def _distort(img: np.ndarray, blur: int, rotation: int, noise: int, rng: random.Random) -> np.ndarray:
+    if rotation:
+        h, w = img.shape[:2]
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), rotation, 1.0)
+        img = cv2.warpAffine(img, matrix, (w, h), borderValue=int(img[0, 0]))
+    if blur:
+        img = cv2.GaussianBlur(img, (blur, blur), 0)
+    if noise:
+        np_rng = np.random.default_rng(rng.randint(0, 2**32 - 1))
+        img = np.clip(img.astype(np.int16) + np_rng.normal(0, noise, img.shape), 0, 255).astype(np.uint8)
+    # Телефонные фото цветные — сохраняем в BGR, как их отдаёт Telegram
+    return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+
+def generate_corpus(seed: int = 42, limit: int | None = None) -> list[dict]:
+    """
+    Строит корпус: декартово произведение всех искажений.
+
+    :return: список {"id", "card_number", "params", "data"}, data — JPEG-байты
+    """
+    rng = random.Random(seed)
+    combos = list(itertools.product(RESOLUTIONS, BLURS, ROTATIONS, JPEG_QUALITIES, NOISE_SIGMAS))
+    if limit is not None and limit < len(combos):
+        combos = rng.sample(combos, limit)
+
+    corpus = []
+    for index, (side, blur, rotation, quality, noise) in enumerate(combos):
+        card_number = str(rng.randint(10**9, 10**10 - 1))
+        payload = f"ST00012|Name=PGB|PersonalAcc=40702810000000000000|f_persAcc={card_number}|Sum=0"
+        img = _distort(_make_card(payload, side, rng), blur, rotation, noise, rng)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise RuntimeError("Не удалось закодировать JPEG")
+        corpus.append({
+            "id": index,
+            "card_number": card_number,
+            "params": {"side": side, "blur": blur, "rotation": rotation, "jpeg": quality, "noise": noise},
+            "data": buf.tobytes(),
+        })
+    return corpus
+
+
+def decode_one(data: bytes, expected: str, backends: tuple[str, ...]) -> tuple[float, str | None, bool, dict]:
+    """
+    Один проход пути декодирования. Возвращает (секунды, стадия, успех, исход).
+    """
+    started = time.perf_counter()
+    outcome = decode_qr_cascade(data, ALL_STAGES, backends)
+    card_number = extract_card_number(outcome.qr_text) if outcome.qr_text else None
+    elapsed = time.perf_counter() - started
+    ok = card_number == expected
+    return elapsed, outcome.stage if ok else None, ok, {"backend": outcome.backend, "timings": outcome.timings}
+
+
+def _decode_chunk(items: list[tuple[int, bytes, str]], backends: tuple[str, ...]) -> list[tuple[int, tuple]]:
+    return [(index, decode_one(data, expected, backends)) for index, data, expected in items]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+
+def run_benchmark(
+    corpus: list[dict],
+    workers: int = 1,
+    repeat: int = 1,
+    backends: tuple[str, ...] = ("pyzbar",),
+) -> dict:
+    samples = corpus * repeat
+    items = [(index, item["data"], item["card_number"]) for index, item in enumerate(samples)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    if workers <= 1:
+        indexed = _decode_chunk(items, backends)
+    else:
+        chunks = [items[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            indexed = [r for chunk in pool.map(_decode_chunk, chunks, [backends] * workers) for r in chunk]
+    results = [result for _, result in sorted(indexed, key=lambda r: r[0])]
+    wall = time.perf_counter() - started
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [r[0] for r in results]
+    stage_hits = Counter(stage for _, stage, ok, _ in results if ok)
+    failures = sum(1 for _, _, ok, _ in results if not ok)
+    total = len(results)
+
+    # Латентность и успешность каждого движка по отдельности
+    by_backend = {}
+    for name in backends:
+        timings = [info["timings"][name] for *_, info in results if name in info["timings"]]
+        wins = sum(1 for _, _, ok, info in results if ok and info["backend"] == name)
+        by_backend[name] = {
+            "attempts": len(timings),
+            "successes": wins,
+            "success_rate": wins / len(timings) if timings else 0.0,
+            "p50_ms": _percentile(timings, 0.50) * 1000,
+            "p95_ms": _percentile(timings, 0.95) * 1000,
+        }
+
+    # Успешность в разрезе каждого искажения: какие условия ломают распознавание
+    by_param: dict[str, dict[str, dict]] = {}
+    for item, (_, _, ok, _) in zip(samples, results):
+        for name, value in item["params"].items():
+            bucket = by_param.setdefault(name, {}).setdefault(str(value), {"total": 0, "ok": 0})
+            bucket["total"] += 1
+            bucket["ok"] += ok
+    for buckets in by_param.values():
+        for bucket in buckets.values():
+            bucket["success_rate"] = bucket["ok"] / bucket["total"]
+
+    return {
+        "images": total,
+        "workers": workers,
+        "backends": list(backends),
+        "wall_seconds": wall,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": _percentile(latencies, 0.50) * 1000,
+            "p95": _percentile(latencies, 0.95) * 1000,
+            "p99": _percentile(latencies, 0.99) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+        "throughput": {
+            "images_per_second": total / wall if wall else 0.0,
+            "images_per_second_per_core": total / wall / workers if wall else 0.0,
+        },
+        "memory": {
+            # tracemalloc видит только главный процесс; для workers > 1 смотрите maxrss детей
+            "peak_traced_mb": peak_traced / 2**20,
+            "maxrss_self_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "maxrss_children_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        },
+        "success": {
+            "rate": (total - failures) / total if total else 0.0,
+            "failures": failures,
+            "by_stage": {stage: {"count": stage_hits.get(stage, 0), "rate": stage_hits.get(stage, 0) / total}
+                         for stage in ALL_STAGES},
+            "by_param": by_param,
+            "by_backend": by_backend,
+        },
+    }
+
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list[str]:
+    """
+    Сравнивает два отчёта. Возвращает список регрессий сверх порога.
+    """
+    regressions = []
+    for key in ("p50", "p95", "p99"):
+        old, new = baseline["results"]["latency_ms"][key], current["results"]["latency_ms"][key]
+        if old and (new - old) / old > max_regression:
+            regressions.append(f"latency {key}: {old:.2f} → {new:.2f} мс")
+    old_rate, new_rate = baseline["results"]["success"]["rate"], current["results"]["success"]["rate"]
+    if new_rate < old_rate - 1e-9:
+        regressions.append(f"success rate: {old_rate:.3f} → {new_rate:.3f}")
+    old_tp = baseline["results"]["throughput"]["images_per_second_per_core"]
+    new_tp = current["results"]["throughput"]["images_per_second_per_core"]
+    if old_tp and (old_tp - new_tp) / old_tp > max_regression:
+        regressions.append(f"throughput/core: {old_tp:.1f} → {new_tp:.1f} img/s")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк распознавания QR на синтетическом корпусе")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--limit", type=int, default=None, help="ограничить размер корпуса")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз прогнать корпус")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов")
+    parser.add_argument("--backends", default="pyzbar",
+                        help=f"движки через запятую в порядке fallback ({', '.join(BACKENDS)})")
+    parser.add_argument("--corpus-dir", help="сохранить корпус в каталог (для ручной проверки)")
+    parser.add_argument("--out", help="куда записать JSON-отчёт (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="допустимое относительное ухудшение латентности/пропускной способности")
+    args = parser.parse_args(argv)
+    backends = tuple(name.strip() for name in args.backends.split(",") if name.strip())
+    unknown = set(backends) - set(BACKENDS)
+    if unknown or not backends:
+        parser.error(f"неизвестные движки: {sorted(unknown)}")
+
+    corpus = generate_corpus(seed=args.seed, limit=args.limit)
+    if args.corpus_dir:
+        os.makedirs(args.corpus_dir, exist_ok=True)
+        for item in corpus:
+            p = item["params"]
+            name = f"{item['id']:04d}_s{p['side']}_b{p['blur']}_r{p['rotation']}_q{p['jpeg']}_n{p['noise']}.jpg"
+            with open(os.path.join(args.corpus_dir, name), "wb") as f:
+                f.write(item["data"])
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "corpus_size": len(corpus),
+            "corpus_bytes": sum(len(item["data"]) for item in corpus),
+            "repeat": args.repeat,
+        },
+        "results": run_benchmark(corpus, workers=args.workers, repeat=args.repeat, backends=backends),
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.max_regression)
+        for line in regressions:
+            print(f"❌ Регрессия: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("✅ Регрессий относительно baseline нет", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+# telegram_bot/bench/roster_sync.py
+"""
+Нагрузочный прогон синхронизации ростера: fake_sheets вместо Google Sheets
+и одноразовая схема Postgres вместо боевых таблиц.
+
+Для каждого размера ростера прогоняются сценарии:
+- cold — пустая БД, все пользователи вставляются;
+- unchanged — таблицы не менялись (304, синхронизация пропускается);
+- churn — изменена доля --churn ростера (повторяется --rounds раз).
+Синхронизация идёт целиком через run_exclusive_sync, по стадиям считается время
+(загрузка, сборка ростера, снимок прав, дельта, запись в БД, точечное обновление
+снимка), число SQL-запросов (по логгеру запросов asyncpg; COPY в него не попадает —
+для него печатается число строк) и пиковая память. Отдельно замеряется чистый
+разбор CSV тех же листов без сети.
+
+Подключение к Postgres — из DB_* окружения; схема bench_roster_<pid> создаётся
+и удаляется прогоном. Файлы кеша пишутся во временный каталог, а не в .cache.
+
+Запуск:
+    python -m telegram_bot.bench.roster_sync --sizes 5000,50000 --churn 0.01 --rounds 3
+    python -m telegram_bot.bench.roster_sync --sizes 5000 --out bench_roster.json
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+_SCHEMA_SQL = """
+    CREATE TABLE {schema}.roles (
+        id serial PRIMARY KEY,
+        name text NOT NULL UNIQUE
+    );
+    CREATE TABLE {schema}.users (
+        id serial PRIMARY KEY,
+        full_name text NOT NULL,
+        username text UNIQUE,
+        is_active boolean DEFAULT true
+    );
+    CREATE TABLE {schema}.user_roles (
+        user_id integer NOT NULL REFERENCES {schema}.users(id) ON DELETE CASCADE,
+        role_id integer NOT NULL REFERENCES {schema}.roles(id) ON DELETE CASCADE,
+        PRIMARY KEY (user_id, role_id)
+    );
+"""
+
+# Стадии синхронизации: имя функции в sheets_cache -> имя стадии в отчёте
+_PHASES = {
+    "fetch_all_sheets": "fetch",
+    "resolve_roster": "resolve",
+    "refresh_auth_snapshot": "snapshot",
+    "compute_roster_delta": "diff",
+    "apply_roster": "db_write",
+    "apply_user_changes": "snapshot_patch",
+    "publish_user_changes": "notify",
+}
+
+
+class _Probe:
+    """Счётчики одного сценария: время стадий, SQL-запросы, строки COPY."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.phases: Counter[str] = Counter()
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.copy_rows = 0
+
+    def on_query(self, record):
+        self.statements += 1
+        self.statement_seconds += record.elapsed
+
+
+def _instrument(module, probe: _Probe):
+    """Оборачивает стадии синхронизации в sheets_cache замером времени."""
+    for attr, phase in _PHASES.items():
+        original = getattr(module, attr)
+
+        def wrap(original=original, phase=phase):
+            if asyncio.iscoroutinefunction(original):
+                @functools.wraps(original)
+                async def timed(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await original(*args, **kwargs)
+                    finally:
+                        probe.phases[phase] += time.perf_counter() - started
+            else:
+                @functools.wraps(original)
+                def timed(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return original(*args, **kwargs)
+                    finally:
+                        probe.phases[phase] += time.perf_counter() - started
+            return timed
+
+        setattr(module, attr, wrap())
+
+    apply_roster = getattr(module, "apply_roster")
+
+    async def counted(roster, *args, **kwargs):
+        probe.copy_rows += sum(len(entry.roles) for entry in roster.values())
+        return await apply_roster(roster, *args, **kwargs)
+
+    module.apply_roster = counted
+
+
+async def _parse_offline(bodies: dict[str, bytes]) -> tuple[float, int]:
+    """Чистый разбор CSV теми же функциями, что и в синхронизации, без сети."""
+    from telegram_bot.services.sheets_connector import CHUNK_SIZE, stream_csv
+    from telegram_bot.services.sheets_cache import _PROJECTIONS
+
+    async def chunks(body: bytes):
+        for i in range(0, len(body), CHUNK_SIZE):
+            yield body[i:i + CHUNK_SIZE]
+
+    started = time.perf_counter()
+    rows = 0
+    for name, body in bodies.items():
+        columns, build = _PROJECTIONS[name]
+        rows += len(build([row async for row in stream_csv(chunks(body), columns)]))
+    return time.perf_counter() - started, rows
+
+
+async def _run_scenario(name: str, size: int, sheets, probe: _Probe, trace_memory: bool) -> dict:
+    from telegram_bot.services import sheets_cache
+
+    probe.reset()
+    sent_before = sheets.stats["bytes_sent"]
+    if trace_memory:
+        tracemalloc.reset_peak()
+
+    started = time.perf_counter()
+    outcome = await sheets_cache.run_exclusive_sync()
+    wall = time.perf_counter() - started
+
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    return {
+        "size": size,
+        "scenario": name,
+        "status": outcome.status if outcome else "locked",
+        "changed_users": outcome.changed_users if outcome else 0,
+        "wall_seconds": wall,
+        "phases": {phase: probe.phases.get(phase, 0.0) for phase in _PHASES.values()},
+        "statements": probe.statements,
+        "statement_seconds": probe.statement_seconds,
+        "copy_rows": probe.copy_rows,
+        "bytes_fetched": sheets.stats["bytes_sent"] - sent_before,
+        "peak_traced_mb": peak / 2**20,
+    }
+
+
+def _reset_sync_state():
+    """Забывает состояние прошлого размера: данные источников, ETag и отпечаток."""
+    from telegram_bot.services import sheets_cache
+
+    sheets_cache._source_state.clear()
+    sheets_cache._validators.clear()
+    sheets_cache._applied_fingerprint = ""
+
+
+async def run(sizes: list[int], churn: float, rounds: int, seed: int,
+              trace_memory: bool, keep_schema: bool) -> dict:
+    import asyncpg
+
+    from telegram_bot.bench.fake_sheets import FakeSheets, FakeSheetsBehaviour, create_app
+    from telegram_bot.services import database, sheets_cache, snapshot_store
+    from telegram_bot.services.http_client import close_http_client
+    from aiohttp import web
+
+    schema = f"bench_roster_{os.getpid()}"
+    admin = await asyncpg.connect(**database._connect_kwargs())
+    await admin.execute(f"CREATE SCHEMA {schema}")
+    await admin.execute(_SCHEMA_SQL.format(schema=schema))
+
+    probe = _Probe()
+
+    async def attach_logger(conn):
+        conn.add_query_logger(probe.on_query)
+
+    await database.init_db_pool(server_settings={"search_path": schema}, init=attach_logger)
+    _instrument(sheets_cache, probe)
+
+    # Файлы кеша — во временный каталог, чтобы не затереть .cache бота
+    tmp_dir = tempfile.TemporaryDirectory(prefix="bench_roster_")
+    sheets_cache.CACHE_FILE = os.path.join(tmp_dir.name, "sheets_data.json")
+    sheets_cache.HASH_FILE = os.path.join(tmp_dir.name, "sheets_hash.txt")
+    snapshot_store.AUTH_SNAPSHOT_FILE = os.path.join(tmp_dir.name, "auth_snapshot.json")
+
+    sheets = FakeSheets(FakeSheetsBehaviour(size=sizes[0], seed=seed))
+    runner = web.AppRunner(create_app(sheets))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", int(os.environ["_FAKE_SHEETS_PORT"])).start()
+
+    if trace_memory:
+        tracemalloc.start()
+    results, datasets = [], []
+    try:
+        for size in sizes:
+            await admin.execute(f"TRUNCATE {schema}.user_roles, {schema}.users, {schema}.roles RESTART IDENTITY")
+            _reset_sync_state()
+            sheets.resize(size)
+            parse_seconds, parsed_rows = await _parse_offline(sheets.bodies)
+            datasets.append({
+                "size": size,
+                **sheets.describe(),
+                "parse_offline_seconds": parse_seconds,
+                "parsed_rows": parsed_rows,
+            })
+
+            results.append(await _run_scenario("cold", size, sheets, probe, trace_memory))
+            results.append(await _run_scenario("unchanged", size, sheets, probe, trace_memory))
+            for i in range(rounds):
+                sheets.churn(churn)
+                results.append(await _run_scenario(f"churn_{i + 1}", size, sheets, probe, trace_memory))
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        await runner.cleanup()
+        await close_http_client()
+        await database.close_db_pool()
+        if not keep_schema:
+            await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+        await admin.close()
+        tmp_dir.cleanup()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "asyncpg": asyncpg.__version__,
+            "schema": schema,
+            "churn": churn,
+            "rounds": rounds,
+            "seed": seed,
+            "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "datasets": datasets,
+        "results": results,
+    }
+
+
+def _print_table(report: dict):
+    print(f"{'size':>7} {'scenario':<10} {'status':<11} {'changed':>7} {'wall,s':>7} "
+          f"{'fetch':>7} {'diff':>7} {'db':>7} {'sql':>5} {'copy':>7} {'KB':>8} {'peak,MB':>8}")
+    for r in report["results"]:
+        p = r["phases"]
+        print(f"{r['size']:>7} {r['scenario']:<10} {r['status']:<11} {r['changed_users']:>7} "
+              f"{r['wall_seconds']:>7.3f} {p['fetch']:>7.3f} {p['diff']:>7.3f} {p['db_write']:>7.3f} "
+              f"{r['statements']:>5} {r['copy_rows']:>7} {r['bytes_fetched'] / 1024:>8.1f} "
+              f"{r['peak_traced_mb']:>8.1f}")
+    for d in report["datasets"]:
+        print(f"разбор CSV без сети, {d['size']} человек: {d['parse_offline_seconds']:.3f} с, "
+              f"{d['parsed_rows']} строк")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон синхронизации ростера")
+    parser.add_argument("--sizes", default="5000,50000", help="размеры ростера через запятую")
+    parser.add_argument("--churn", type=float, default=0.01, help="доля ростера, меняющаяся за раунд")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="не считать пиковую память (tracemalloc замедляет прогон)")
+    parser.add_argument("--keep-schema", action="store_true", help="не удалять схему после прогона")
+    parser.add_argument("--verbose", action="store_true", help="логи синхронизации в stdout")
+    parser.add_argument("--out", help="куда записать JSON-отчёт")
+    args = parser.parse_args()
+
+    # Конфигурация читается при импорте, поэтому окружение готовим до импорта sheets_cache
+    from telegram_bot.bench.card_api_resilience import _free_port
+
+    port = _free_port()
+    os.environ["_FAKE_SHEETS_PORT"] = str(port)
+    os.environ["SHEETS_EXPORT_BASE_URL"] = f"http://127.0.0.1:{port}"
+    from telegram_bot.bench.fake_sheets import SHEET_GIDS
+    for name, gid in SHEET_GIDS.items():
+        os.environ[f"GID_{name.upper()}"] = str(gid)
+        os.environ[f"SPREADSHEET_ID_{name.upper()}"] = f"bench_{name}"
+    os.environ["USE_SHEETS_CACHE"] = "false"
+    for name in ("BOT_TOKEN", "QR_API_URL", "QR_API_KEY"):
+        os.environ.setdefault(name, "bench")
+
+    from telegram_bot.services.log_service import setup_logger
+    setup_logger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = asyncio.run(run(sizes, args.churn, args.rounds, args.seed,
+                             trace_memory=not args.no_tracemalloc, keep_schema=args.keep_schema))
+    _print_table(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
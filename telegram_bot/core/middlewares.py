@@ -0,0 +1,47 @@
+# telegram_bot/core/middlewares.py
+
+import time
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# Метрики старта: заполняются в main() и мидлварью первого ответа
+startup_stats: dict[str, Any] = {
+    "snapshot_source": None,    # откуда взят снимок прав при старте: "disk", "db" или None
+    "snapshot_load_ms": None,
+    "ready_seconds": None,      # от запуска процесса до начала опроса Telegram
+    "first_reply_seconds": None,
+}
+
+
+class FirstReplyMiddleware(BaseMiddleware):
+    """
+    Замеряет время от запуска процесса до первого обработанного апдейта
+    (холодный старт глазами пользователя) и пишет его в лог один раз.
+    """
+
+    def __init__(self, boot_started: float):
+        self.boot_started = boot_started
+        self.reported = False
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        result = await handler(event, data)
+        if not self.reported:
+            self.reported = True
+            elapsed = time.monotonic() - self.boot_started
+            startup_stats["first_reply_seconds"] = elapsed
+            logger.info(f"⏱️ Первый ответ через {elapsed:.2f} с после запуска")
+        return result
+
+
+def get_startup_stats() -> dict:
+    return dict(startup_stats)
@@ -2,7 +2,7 @@
 
 import logging
 from aiogram import Router
-from telegram_bot.handlers import start, menu, qr_scanner
+from telegram_bot.handlers import start, menu, qr_scanner, stats
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +12,7 @@ def setup_routers() -> Router:
     subrouters = [
         start.router,
         menu.router,
+        stats.router,
         qr_scanner.router
     ]
 
@@ -1,14 +1,14 @@
 # telegram_bot/handlers/admin_menu.py
 import logging
-import os
 import asyncio
 
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, FSInputFile
+from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from telegram_bot.services.access_control import get_user_info
 from telegram_bot.services.text_service import render_welcome
+from telegram_bot.services.image_cache import send_image
 from telegram_bot.keyboards.inline import get_admin_role_choice_keyboard
 from telegram_bot.handlers.qr_scanner import send_qr_scanner
 
@@ -46,8 +46,7 @@ async def return_to_role_selection(callback: CallbackQuery, state: FSMContext):
     asyncio.create_task(safe_delete_by_id(callback.bot, callback.message.chat.id, callback.message.message_id))
 
     # Отправляем логотип и welcome
-    logo_path = os.path.join(os.path.dirname(__file__), "..", "domain", "img", "logo.png")
-    await callback.message.answer_photo(FSInputFile(logo_path))
+    await send_image(callback.message, "logo.png")
 
     welcome_text = render_welcome(full_name, primary_role)
     kb = get_admin_role_choice_keyboard()
@@ -3,7 +3,7 @@ import asyncio
 import logging
 import os
 import urllib.parse
-from telegram_bot.services.image_cache import get_image
+from telegram_bot.services.image_cache import send_image
 
 from aiogram import Router, F, Bot
 from aiogram.fsm.context import FSMContext
@@ -82,12 +82,12 @@ async def handle_menu_callback(callback: CallbackQuery, state: FSMContext):
                 message_ids.append(sent_text.message_id)
 
                 img_filename = "sitmap.png" if filename == "visitors.md" else "fireext.png"
-                photo = get_image(img_filename)
-                if photo:
-                    sent_photo = await callback.message.answer_photo(
-                        photo=photo,
-                        reply_markup=get_back_to_menu_keyboard(current_role)
-                    )
+                sent_photo = await send_image(
+                    callback.message,
+                    img_filename,
+                    reply_markup=get_back_to_menu_keyboard(current_role)
+                )
+                if sent_photo:
                     message_ids.append(sent_photo.message_id)
                 else:
                     logger.warning(f"❌ Изображение {img_filename} не найдено в кеше.")
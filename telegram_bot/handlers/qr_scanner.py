@@ -1,41 +1,31 @@
 # telegram_bot/handlers/qr_scanner.py
 import logging
-import re
-import cv2
-import numpy as np
 import asyncio
-from pyzbar.pyzbar import decode
-import aiohttp
+from functools import partial
+from typing import Awaitable, Callable
 
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import (
-    Message, PhotoSize, InlineKeyboardMarkup,
+    Message, InlineKeyboardMarkup,
     InlineKeyboardButton, CallbackQuery
 )
+from cachetools import TTLCache
 
 from telegram_bot.services.access_control import get_user_info
-from telegram_bot.app.config import QR_API_URL, QR_API_KEY
+from telegram_bot.services.decode_executor import DecodeQueueFull, DecodeWorkerCrashed
+from telegram_bot.services.qr_scan import scan_photo
+from telegram_bot.services.card_api import get_card_info, is_card_api_available, CardLookup
+from telegram_bot.services.scan_scheduler import scan_scheduler, ScanSuperseded
+from telegram_bot.app.config import MEDIA_GROUP_WINDOW
 
 router = Router()
 logger = logging.getLogger(__name__)
 
-
-def extract_card_number(qr_data: str) -> str | None:
-    match = re.search(r"f_persAcc=(\d+)", qr_data)
-    return match.group(1) if match else None
-
-
-async def fetch_card_info(card_number: str) -> dict | None:
-    params = {"cardNumber": card_number, "apikey": QR_API_KEY}
-    try:
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-            async with session.get(QR_API_URL, params=params) as response:
-                response.raise_for_status()
-                return await response.json()
-    except aiohttp.ClientError as e:
-        logger.error(f"Ошибка при запросе к API: {e}")
-        return None
+# Альбомы в процессе сборки: {media_group_id: [Message, ...]}
+_media_groups: dict[str, list[Message]] = {}
+# Недавно собранные альбомы: фото, опоздавшее после сбора пачки, в неё уже не попадёт
+_finished_groups: TTLCache = TTLCache(maxsize=1000, ttl=60)
 
 
 async def safe_delete_by_id(bot, chat_id: int, message_id: int):
@@ -76,6 +66,38 @@ async def global_qr_handler(message: Message, state: FSMContext):
         logger.info(f"@{username} не авторизован, игнорируем фото.")
         return
 
+    # Фото из альбома собираем в пачку и отвечаем на неё одним сообщением
+    if message.media_group_id:
+        await _collect_media_group(message, state, info)
+        return
+
+    await _run_scheduled(message, partial(_handle_photo, message, state, info))
+
+
+async def _run_scheduled(message: Message, scan: Callable[[], Awaitable[None]]):
+    """
+    Запускает скан через планировщик: общий лимит одновременных сканов,
+    один активный скан на чат, более новое фото вытесняет ждущее в очереди.
+    """
+    queue_msg_ids = []
+
+    async def on_queued(position: int):
+        msg = await message.answer(f"⏳ Много сканов одновременно. Ваша позиция в очереди: {position}")
+        queue_msg_ids.append(msg.message_id)
+
+    try:
+        async with scan_scheduler.slot(message.chat.id, on_queued=on_queued):
+            for msg_id in queue_msg_ids:
+                asyncio.create_task(safe_delete_by_id(message.bot, message.chat.id, msg_id))
+            await scan()
+    except ScanSuperseded:
+        logger.info(f"⏭️ Скан в чате {message.chat.id} вытеснен более новым фото")
+        for msg_id in queue_msg_ids:
+            asyncio.create_task(safe_delete_by_id(message.bot, message.chat.id, msg_id))
+
+
+async def _handle_photo(message: Message, state: FSMContext, info: dict):
+    username = message.from_user.username
     data = await state.get_data()
     user_role = info["roles"][0]
     scanning_role = data.get("scanning_role") or data.get("admin_subrole") or user_role
@@ -88,37 +110,160 @@ async def global_qr_handler(message: Message, state: FSMContext):
     progress_msg = await message.answer("📸 Распознаю QR-код...")
     await state.update_data({**data, "active_message_ids": [progress_msg.message_id, message.message_id]})
 
-    photo: PhotoSize = message.photo[-1]
-    file = await message.bot.get_file(photo.file_id)
-    file_bytes = await message.bot.download_file(file.file_path)
-    img_array = np.frombuffer(file_bytes.read(), np.uint8)
-    img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-    decoded = decode(img)
+    # Каскад: от маленькой рендиции к большой, декодирование — в пуле воркеров
+    try:
+        scan = await scan_photo(message.bot, message.photo)
+    except DecodeQueueFull:
+        logger.warning(f"⏳ Очередь декодирования переполнена, фото от @{username} отклонено")
+        asyncio.create_task(safe_delete_by_id(message.bot, message.chat.id, progress_msg.message_id))
+        await _send_qr_response(message, "⏳ Сканер перегружен, отправьте фото ещё раз через пару секунд.", scanning_role, state=state)
+        return
+    except DecodeWorkerCrashed:
+        logger.error(f"💥 Воркер декодирования упал на фото от @{username}")
+        asyncio.create_task(safe_delete_by_id(message.bot, message.chat.id, progress_msg.message_id))
+        await _send_qr_response(message, "⚠️ Сканер перезапускается, отправьте фото ещё раз.", scanning_role, state=state)
+        return
+
+    qr_text = scan.qr_text
 
     # Фоново удаляем индикатор загрузки
     asyncio.create_task(safe_delete_by_id(message.bot, message.chat.id, progress_msg.message_id))
 
-    if not decoded:
+    if not qr_text:
         await _send_qr_response(message, "❌ Не удалось распознать QR.", scanning_role, state=state)
         return
 
-    qr_text = decoded[0].data.decode("utf-8")
-    logger.debug(f"🔎 Распознан QR: {qr_text}")
+    logger.debug(f"🔎 Распознан QR ({scan.stage}): {qr_text}")
 
-    card_number = extract_card_number(qr_text)
+    card_number = scan.card_number
     if not card_number:
         await _send_qr_response(message, "❌ В QR-коде нет f_persAcc.", scanning_role, state=state)
         return
 
-    data_api = await fetch_card_info(card_number)
-    if not data_api:
-        await _send_qr_response(message, "❌ Ошибка при запросе к серверу.", scanning_role, state=state)
+    lookup = await get_card_info(card_number)
+    if not lookup.data:
+        await _send_qr_response(message, _card_api_error_text(), scanning_role, state=state)
         return
 
-    balance = data_api.get("Balance", "неизвестно")
-    history = data_api.get("BalanceHistory", [])
+    text = _format_card_text(card_number, lookup)
+    await _send_qr_response(message, text, scanning_role, state=state, markdown=True)
+
 
-    text = f"**Номер карты**: `{card_number}`\n**Баланс**: `{balance}`\n\n"
+async def _collect_media_group(message: Message, state: FSMContext, info: dict):
+    """
+    Telegram присылает альбом отдельными апдейтами. Первый апдейт группы
+    ждёт, пока новые фото перестанут приходить (MEDIA_GROUP_WINDOW),
+    и обрабатывает всю пачку; остальные просто добавляются в неё.
+    На фото, пришедшее уже после сбора пачки, отвечаем, что оно пропущено:
+    отдельный скан вытеснил бы из очереди ещё не обработанный альбом.
+    """
+    group_id = message.media_group_id
+    if group_id in _finished_groups:
+        logger.info(f"⏭️ Фото {message.message_id} пришло после сбора альбома {group_id}, пропускаем")
+        await message.reply("⏭️ Это фото пришло после остальных фото альбома и не распознано — отправьте его отдельно.")
+        return
+
+    batch = _media_groups.get(group_id)
+    if batch is not None:
+        batch.append(message)
+        return
+
+    batch = [message]
+    _media_groups[group_id] = batch
+    try:
+        seen = 0
+        while seen != len(batch):
+            seen = len(batch)
+            await asyncio.sleep(MEDIA_GROUP_WINDOW)
+    finally:
+        _finished_groups[group_id] = True
+        _media_groups.pop(group_id, None)
+
+    batch.sort(key=lambda m: m.message_id)
+    await _run_scheduled(batch[0], partial(_handle_album, batch, state, info))
+
+
+async def _handle_album(messages: list[Message], state: FSMContext, info: dict):
+    first = messages[0]
+    username = first.from_user.username
+    logger.info(f"🗂️ Альбом из {len(messages)} фото от @{username}")
+
+    data = await state.get_data()
+    user_role = info["roles"][0]
+    scanning_role = data.get("scanning_role") or data.get("admin_subrole") or user_role
+    data["scanning_role"] = scanning_role
+
+    asyncio.create_task(update_active_messages(first, state, []))
+
+    progress_msg = await first.answer(f"📸 Распознаю QR-коды: {len(messages)} фото...")
+    photo_ids = [m.message_id for m in messages]
+    await state.update_data({**data, "active_message_ids": [progress_msg.message_id, *photo_ids]})
+
+    # Все фото скачиваем и декодируем параллельно
+    scans = await asyncio.gather(
+        *(scan_photo(m.bot, m.photo) for m in messages),
+        return_exceptions=True
+    )
+
+    # Балансы всех найденных карт запрашиваем параллельно (повторы объединяет get_card_info)
+    card_numbers = {
+        scan.card_number for scan in scans
+        if not isinstance(scan, BaseException) and scan.card_number
+    }
+    lookups = dict(zip(card_numbers, await asyncio.gather(
+        *(get_card_info(c) for c in card_numbers),
+        return_exceptions=True
+    )))
+
+    asyncio.create_task(safe_delete_by_id(first.bot, first.chat.id, progress_msg.message_id))
+
+    parts = []
+    for index, scan in enumerate(scans, start=1):
+        header = f"**Фото {index}**: "
+        if isinstance(scan, DecodeQueueFull):
+            parts.append(header + "⏳ сканер перегружен, отправьте ещё раз.")
+        elif isinstance(scan, DecodeWorkerCrashed):
+            parts.append(header + "⚠️ сканер перезапускается, отправьте ещё раз.")
+        elif isinstance(scan, BaseException):
+            logger.error(f"❌ Ошибка распознавания фото {index} из альбома: {scan}")
+            parts.append(header + "❌ ошибка распознавания.")
+        elif not scan.qr_text:
+            parts.append(header + "❌ не удалось распознать QR.")
+        elif not scan.card_number:
+            parts.append(header + "❌ в QR-коде нет f_persAcc.")
+        elif isinstance(lookups[scan.card_number], BaseException):
+            logger.error(f"❌ Ошибка запроса карты {scan.card_number} из альбома: {lookups[scan.card_number]}")
+            parts.append(header + f"`{scan.card_number}` — {_card_api_error_text()}")
+        elif not lookups[scan.card_number].data:
+            parts.append(header + f"`{scan.card_number}` — {_card_api_error_text()}")
+        else:
+            parts.append(header + _format_card_text(scan.card_number, lookups[scan.card_number], with_history=False))
+
+    await _send_qr_response(first, "\n".join(parts), scanning_role, state=state, markdown=True)
+
+
+def _card_api_error_text() -> str:
+    if not is_card_api_available():
+        return "⛔ Сервер карт временно недоступен, попробуйте через минуту."
+    return "❌ Ошибка при запросе к серверу."
+
+
+def _format_card_text(card_number: str, lookup: CardLookup, with_history: bool = True) -> str:
+    """
+    Текст ответа по карте. В сводке по альбому историю операций не выводим,
+    чтобы ответ укладывался в одно сообщение.
+    """
+    balance = lookup.data.get("Balance", "неизвестно")
+
+    text = f"**Номер карты**: `{card_number}`\n**Баланс**: `{balance}`"
+    if lookup.cached:
+        text += f" _(из кеша, {int(lookup.age)} с назад)_"
+    text += "\n"
+    if not with_history:
+        return text
+
+    text += "\n"
+    history = lookup.data.get("BalanceHistory", [])
     if history:
         text += "**История операций**:\n"
         for h in history:
@@ -127,8 +272,7 @@ async def global_qr_handler(message: Message, state: FSMContext):
             dt = h.get("date", "?")
             place = h.get("parkObjectName", "")
             text += f"{dt} {sign}{val} {place}\n"
-
-    await _send_qr_response(message, text, scanning_role, state=state, markdown=True)
+    return text
 
 
 async def _send_qr_response(
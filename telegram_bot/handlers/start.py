@@ -6,7 +6,6 @@ import os
 from aiogram import Router, F, Bot
 from aiogram.types import (
     Message,
-    FSInputFile,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     CallbackQuery
@@ -15,6 +14,7 @@ from aiogram.fsm.context import FSMContext
 
 from telegram_bot.services.access_control import get_user_info
 from telegram_bot.services.text_service import get_text_block, render_welcome
+from telegram_bot.services.image_cache import send_image
 from telegram_bot.keyboards.inline import get_admin_role_choice_keyboard
 from telegram_bot.handlers.qr_scanner import send_qr_scanner
 from telegram_bot.handlers.menu import show_main_menu_for_role
@@ -52,16 +52,9 @@ async def start_handler(message: Message, state: FSMContext):
 
     await state.clear()
 
-    logo = None
-    try:
-        from telegram_bot.services.image_cache import get_image
-        logo = get_image("logo.png")
-    except Exception:
+    if await send_image(message, "logo.png") is None:
         logger.warning("❌ Логотип logo.png не найден в кеше.")
 
-    if logo:
-        await message.answer_photo(logo)
-
     welcome_text = render_welcome(full_name, primary_role)
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[ 
@@ -0,0 +1,161 @@
+# telegram_bot/handlers/stats.py
+import time
+import logging
+
+from aiogram import Router, F
+from aiogram.types import Message
+
+from telegram_bot.core.middlewares import get_startup_stats
+from telegram_bot.services.access_control import (
+    get_user_info,
+    get_auth_snapshot_stats,
+    get_user_cache_stats,
+)
+from telegram_bot.services.auth_notify import get_auth_listener_stats
+from telegram_bot.services.card_api import get_card_cache_stats, get_card_api_health
+from telegram_bot.services.content_watcher import get_content_watcher_stats
+from telegram_bot.services.database import get_db_pool_stats
+from telegram_bot.services.decode_executor import get_decode_stats
+from telegram_bot.services.image_cache import get_image_cache_stats
+from telegram_bot.services.qr_scan import get_scan_cache_stats, get_decoder_stats
+from telegram_bot.services.scan_scheduler import get_scan_scheduler_stats
+from telegram_bot.services.sync_scheduler import get_sync_scheduler_stats
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+
+def _format_stats() -> str:
+    decode = get_decode_stats()
+    cards = get_card_cache_stats()
+    scans = get_scan_cache_stats()
+    queue = get_scan_scheduler_stats()
+    decoders = get_decoder_stats()
+    api = get_card_api_health()
+    breaker = api["breaker"]
+    db = get_db_pool_stats()
+    auth = get_auth_snapshot_stats()
+    users = get_user_cache_stats()
+    listener = get_auth_listener_stats()
+    startup = get_startup_stats()
+    sync = get_sync_scheduler_stats()
+    content = get_content_watcher_stats()
+    images = get_image_cache_stats()
+
+    first_reply = startup["first_reply_seconds"]
+    lines = [
+        "📊 Статистика бота",
+        "",
+        "⏱️ Старт:",
+        f"- готов к работе через {startup['ready_seconds'] or 0:.2f} с, первый ответ через "
+        + (f"{first_reply:.2f} с" if first_reply is not None else "—"),
+        f"- снимок прав при старте: {startup['snapshot_source'] or 'нет'}"
+        + (f", {startup['snapshot_load_ms']:.1f} мс" if startup["snapshot_load_ms"] is not None else ""),
+        "",
+        "🚦 Очередь сканов:",
+        f"- активно: {queue['active']} / {queue['limit']}, в очереди: {queue['depth']} (макс. {queue['max_depth']})",
+        f"- допущено: {queue['admitted']}, ждали: {queue['queued']}, вытеснено: {queue['superseded']}",
+        f"- ожидание p50/p95/max: {queue['wait_p50']:.2f} / {queue['wait_p95']:.2f} / {queue['wait_max']:.2f} с",
+        "",
+        "🧵 Декодирование QR:",
+        f"- пул: {decode['pool']} x{decode['workers']}",
+        f"- в работе: {decode['pending']} / {decode['queue_size']}",
+        f"- пул пересоздан: {decode['recycled']} (таймауты: {decode['timeouts']}, падения: {decode['crashes']})",
+    ]
+    for name, backend in decoders["backends"].items():
+        lines.append(
+            f"- {name}: {backend['successes']}/{backend['attempts']} ({backend['success_rate']:.0%}), "
+            f"p50 {backend['latency_p50'] * 1000:.0f} мс, p95 {backend['latency_p95'] * 1000:.0f} мс"
+        )
+    lines += [
+        "",
+        "🖼️ Кеш распознанных фото:",
+        f"- попадания: {scans['hits']}, промахи: {scans['misses']}, hit rate: {scans['hit_rate']:.0%}",
+        f"- размер: {scans['size']} / {scans['maxsize']}, вытеснено: {scans['evictions']}",
+        "",
+        "💳 Кеш карт:",
+        f"- попадания: {cards['hits']}, промахи: {cards['misses']}, объединено: {cards['coalesced']}",
+        f"- hit rate: {cards['hit_rate']:.0%}",
+        f"- размер: {cards['size']} / {cards['maxsize']}, TTL {cards['ttl']} с",
+        "",
+        "🌐 API карт:",
+        f"- предохранитель: {breaker['state']}"
+        + (f" (повтор через {breaker['retry_in']:.0f} с)" if breaker["state"] == "open" else ""),
+        f"- ошибок подряд: {breaker['consecutive_failures']}, открывался: {breaker['opened']}, "
+        f"отклонено: {breaker['rejected']}",
+        f"- запросы: {api['requests']}, повторы: {api['retries']}, ошибки: {api['errors']}, "
+        f"бюджет исчерпан: {api['retry_budget']['exhausted']}",
+        f"- хеджи: {api['hedges']} (выиграли {api['hedge_wins']}), "
+        f"p50/p95: {api['latency_p50'] * 1000:.0f} / {api['latency_p95'] * 1000:.0f} мс",
+        "",
+        "🛢️ Пул БД:",
+        f"- соединений: {db['in_use']} занято / {db['size']} открыто (от {db['min_size']} до {db['max_size']})",
+        f"- выдано: {db['acquired']}, при насыщении: {db['saturated']}, таймаутов: {db['timeouts']}",
+        f"- ожидание p50/p95/max: {db['wait_p50'] * 1000:.1f} / {db['wait_p95'] * 1000:.1f} / {db['wait_max'] * 1000:.1f} мс",
+        "",
+        "🗂️ Снимок прав:",
+    ]
+    if auth["loaded"]:
+        lines += [
+            f"- версия: {auth['version']} ({auth['source']}), пользователей: {auth['users']}, "
+            f"собран {auth['age']:.0f} с назад за {auth['build_seconds'] * 1000:.1f} мс",
+            f"- попадания: {auth['hits']}, через БД: {auth['fallbacks']}, "
+            f"пересборок: {auth['rebuilds']}, точечных обновлений: {auth['patches']}, ошибок: {auth['failures']}",
+        ]
+    else:
+        lines.append(f"- не загружен, авторизация через БД ({auth['fallbacks']} запросов)")
+    lines += [
+        f"- кеш мимо снимка: {users['size']} найдено + {users['negative_size']} не найдено / {users['maxsize']}, "
+        f"TTL {users['ttl']:.0f} / {users['negative_ttl']:.0f} с",
+        f"- попадания: {users['hits']}, отрицательные: {users['negative_hits']}, промахи: {users['misses']}, "
+        f"объединено: {users['coalesced']}, сброшено: {users['invalidated']}",
+        f"- LISTEN {listener['channel']}: {'подключён' if listener['connected'] else 'нет соединения'}, "
+        f"получено: {listener['received']}, отправлено: {listener['published']}, "
+        f"переподключений: {listener['reconnects']}",
+    ]
+    lines += [
+        "",
+        "🔄 Синхронизация с Google Sheets:",
+        f"- запусков: {sync['runs']}, с изменениями: {sync['applied']}, без изменений: {sync['unchanged']}, "
+        f"у другой реплики: {sync['locked']}, ошибок: {sync['failed']}, внеочередных: {sync['woken']}",
+        f"- интервал: {sync['interval']:.0f} с" + (f", ошибок подряд: {sync['failures']}" if sync["failures"] else ""),
+    ]
+    for run in list(reversed(sync["history"]))[:5]:
+        lines.append(
+            f"- {time.strftime('%H:%M:%S', time.localtime(run['started_at']))} {run['outcome']} "
+            f"за {run['seconds']:.1f} с" + (f", изменено {run['changed_users']}" if run["changed_users"] else "")
+        )
+    lines += ["", "♻️ Горячая перезагрузка контента:"]
+    if content["enabled"]:
+        lines.append(
+            f"- файлов под наблюдением: {content['files_watched']}, опрос раз в {content['interval']:.0f} с, "
+            f"перезагрузок: {content['reloads']} ({content['files']} файлов), ошибок: {content['failures']}"
+        )
+        last = content["last"]
+        if last:
+            lines.append(
+                f"- последняя: {time.strftime('%H:%M:%S', time.localtime(last['at']))} {last['target']}: "
+                f"{', '.join(last['files'])} за {last['seconds'] * 1000:.1f} мс"
+            )
+    else:
+        lines.append("- выключена")
+    lines += [
+        "",
+        "🖼️ Изображения:",
+        f"- в кеше: {images['images']}, file_id: {images['file_ids']}",
+        f"- отправлено по file_id: {images['by_file_id']}, загрузок: {images['uploads']} "
+        f"({images['uploaded_bytes'] / 1024:.0f} КБ), ждали загрузку: {images['coalesced']}, "
+        f"отклонённых file_id: {images['stale_file_ids']}",
+    ]
+    return "\n".join(lines)
+
+
+@router.message(F.text == "/stats")
+async def stats_handler(message: Message):
+    username = message.from_user.username
+    info = await get_user_info(username)
+    if not info or "admin" not in info["roles"]:
+        logger.info(f"🚫 @{username} запросил /stats без прав администратора")
+        return
+
+    await message.answer(_format_stats(), parse_mode=None)
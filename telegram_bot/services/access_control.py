@@ -1,14 +1,230 @@
 # telegram_bot/services/access_control.py
 
+import asyncio
 import logging
 import time
-from typing import Optional
-from telegram_bot.services.database import get_async_connection
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+
+from cachetools import TTLCache
+
+from telegram_bot.app.config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL, AUTH_NEGATIVE_TTL
+from telegram_bot.services.database import acquire_connection
+from telegram_bot.services.snapshot_store import save_auth_snapshot, load_auth_snapshot
 
 logger = logging.getLogger(__name__)
 
-_CACHE_TTL_SECONDS = 30
-_user_cache: dict[str, tuple[float, dict]] = {}  # username -> (timestamp, data)
+# LRU с временем жизни: найденные пользователи и отдельно — ненайденные,
+# чтобы неавторизованный спам не ходил в БД на каждое сообщение
+_user_cache: TTLCache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)  # username -> data
+_negative_cache: TTLCache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_NEGATIVE_TTL)  # username -> True
+# Загрузки «в полёте»: параллельные промахи по одному username ждут один запрос
+_inflight: dict[str, asyncio.Task] = {}
+# Растёт при каждой инвалидации: загрузка, начатая до неё, не попадёт в кеш
+_generation = 0
+_cache_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "coalesced": 0, "invalidated": 0}
+
+# Пользователь вместе с ролями за один запрос. Один и тот же текст запроса
+# и для одиночного, и для пакетного поиска: asyncpg кеширует подготовленный
+# оператор на соединении (DB_STATEMENT_CACHE_SIZE), так что разбор и план
+# выполняются один раз на соединение пула.
+_USERS_WITH_ROLES_SQL = """
+    SELECT u.username,
+           u.full_name,
+           u.is_active,
+           COALESCE(
+               array_agg(r.name ORDER BY r.id) FILTER (WHERE r.name IS NOT NULL),
+               '{}'
+           ) AS roles
+    FROM users u
+    LEFT JOIN user_roles ur ON ur.user_id = u.id
+    LEFT JOIN roles r ON r.id = ur.role_id
+    WHERE u.username = ANY($1::text[])
+    GROUP BY u.id
+"""
+
+# Тот же запрос по всем пользователям — для снимка прав доступа
+_ALL_USERS_WITH_ROLES_SQL = _USERS_WITH_ROLES_SQL.replace(
+    "WHERE u.username = ANY($1::text[])", "WHERE u.username IS NOT NULL"
+)
+
+
+@dataclass(frozen=True)
+class AuthSnapshot:
+    """
+    Неизменяемый снимок прав: username -> {"full_name", "roles", "is_active"}.
+    Пересобирается целиком и подменяется одной операцией присваивания,
+    поэтому обработчики никогда не видят наполовину обновлённые данные.
+    """
+    users: Mapping[str, Mapping] = field(default_factory=lambda: MappingProxyType({}))
+    version: int = 0
+    built_at: float = 0.0       # time.time() момента сборки
+    build_seconds: float = 0.0
+    source: str = "db"          # "db" или "disk" (тёплый старт из файла)
+
+
+_snapshot: AuthSnapshot | None = None
+_snapshot_stats = {"hits": 0, "fallbacks": 0, "rebuilds": 0, "patches": 0, "failures": 0}
+
+
+def _freeze(info: Mapping) -> Mapping:
+    return MappingProxyType({
+        "full_name": info["full_name"],
+        "roles": tuple(info["roles"]),
+        "is_active": info["is_active"],
+    })
+
+
+def has_auth_snapshot() -> bool:
+    return _snapshot is not None
+
+
+def get_auth_snapshot() -> AuthSnapshot | None:
+    return _snapshot
+
+
+async def _persist_snapshot(snapshot: AuthSnapshot):
+    try:
+        size = await save_auth_snapshot(snapshot.users, snapshot.version, snapshot.built_at)
+        logger.debug(f"💾 Снимок прав v{snapshot.version} сохранён на диск ({size} байт)")
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось сохранить снимок прав на диск: {e}")
+
+
+async def load_persisted_auth_snapshot() -> bool:
+    """
+    Тёплый старт: поднимает снимок прав, сохранённый прошлым запуском,
+    чтобы бот отвечал до первого обращения к БД и Google Sheets.
+
+    :return: удалось ли загрузить снимок
+    """
+    global _snapshot
+    started = time.monotonic()
+    loaded = await load_auth_snapshot()
+    if loaded is None or _snapshot is not None:
+        return False
+    users, version, built_at = loaded
+    _snapshot = AuthSnapshot(
+        users=MappingProxyType({username: _freeze(info) for username, info in users.items()}),
+        version=version,
+        built_at=built_at,
+        build_seconds=time.monotonic() - started,
+        source="disk",
+    )
+    logger.info(
+        f"💾 Снимок прав v{version} загружен с диска: {len(users)} пользователей "
+        f"за {_snapshot.build_seconds * 1000:.1f} мс (собран {time.time() - built_at:.0f} с назад)"
+    )
+    return True
+
+
+async def refresh_auth_snapshot() -> set[str]:
+    """
+    Собирает снимок прав из БД одним запросом, атомарно подменяет текущий
+    и сохраняет его на диск. Вызывается при старте бота и при каждой
+    синхронизации с Google Sheets.
+
+    :return: username, у которых права изменились относительно прошлого снимка
+    """
+    global _snapshot
+    started = time.monotonic()
+    try:
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(_ALL_USERS_WITH_ROLES_SQL)
+    except Exception:
+        _snapshot_stats["failures"] += 1
+        raise
+
+    users = {row["username"]: _freeze(row) for row in rows}
+    previous = _snapshot.users if _snapshot else {}
+    changed = {
+        username for username in previous.keys() | users.keys()
+        if username not in previous or username not in users
+        or dict(previous[username]) != dict(users[username])
+    }
+    version = (_snapshot.version if _snapshot else 0) + 1
+    persist = bool(changed) or _snapshot is None or _snapshot.source != "db"
+    _snapshot = AuthSnapshot(
+        users=MappingProxyType(users),
+        version=version,
+        built_at=time.time(),
+        build_seconds=time.monotonic() - started,
+    )
+    _snapshot_stats["rebuilds"] += 1
+    logger.info(
+        f"🗂️ Снимок прав v{version}: {len(users)} пользователей, изменилось {len(changed)}, "
+        f"за {_snapshot.build_seconds * 1000:.1f} мс"
+    )
+    if persist:
+        await _persist_snapshot(_snapshot)
+    return changed
+
+
+async def apply_user_changes(usernames: Iterable[str]):
+    """
+    Точечно обновляет права указанных пользователей: перечитывает их из БД,
+    подменяет снимок копией с новыми записями и сбрасывает их из кешей.
+    Так процесс узнаёт об изменениях, сделанных синхронизацией в другом процессе.
+    """
+    global _snapshot
+    usernames = list(dict.fromkeys(usernames))
+    if not usernames:
+        return
+    started = time.monotonic()
+    found = await _fetch_users(usernames)
+
+    current = _snapshot
+    if current is not None:
+        users = dict(current.users)
+        for username in usernames:
+            if username in found:
+                users[username] = _freeze(found[username])
+            else:
+                users.pop(username, None)
+        _snapshot = AuthSnapshot(
+            users=MappingProxyType(users),
+            version=current.version + 1,
+            built_at=time.time(),
+            build_seconds=time.monotonic() - started,
+            source=current.source,
+        )
+        _snapshot_stats["patches"] += 1
+        logger.info(f"🗂️ Снимок прав v{_snapshot.version}: обновлено {len(usernames)} пользователей")
+        await _persist_snapshot(_snapshot)
+    invalidate_users(usernames)
+
+
+def get_auth_snapshot_stats() -> dict:
+    snapshot = _snapshot
+    return {
+        **_snapshot_stats,
+        "loaded": snapshot is not None,
+        "version": snapshot.version if snapshot else 0,
+        "source": snapshot.source if snapshot else None,
+        "users": len(snapshot.users) if snapshot else 0,
+        "built_at": snapshot.built_at if snapshot else None,
+        "age": time.time() - snapshot.built_at if snapshot else None,
+        "build_seconds": snapshot.build_seconds if snapshot else 0.0,
+    }
+
+
+async def _fetch_users(usernames: list[str]) -> dict[str, dict]:
+    """
+    Загружает пользователей и их роли одним запросом.
+
+    :return: {username: {"full_name", "roles", "is_active"}} — только найденные
+    """
+    async with acquire_connection() as conn:
+        rows = await conn.fetch(_USERS_WITH_ROLES_SQL, usernames)
+    return {
+        row["username"]: {
+            "full_name": row["full_name"],
+            "roles": list(row["roles"]),
+            "is_active": row["is_active"],
+        }
+        for row in rows
+    }
 
 
 async def get_user_info(username: str) -> Optional[dict]:
@@ -19,54 +235,138 @@ async def get_user_info(username: str) -> Optional[dict]:
         logger.warning("🛑 Запрос без username")
         return None
 
-    now = time.time()
-    cached = _user_cache.get(username)
-    if cached and now - cached[0] < _CACHE_TTL_SECONDS:
+    snapshot = _snapshot
+    if snapshot is not None:
+        info = snapshot.users.get(username)
+        if info is not None:
+            _snapshot_stats["hits"] += 1
+            return info
+    # Снимка ещё нет или пользователя добавили в БД в обход синхронизации
+    _snapshot_stats["fallbacks"] += 1
+
+    info = _user_cache.get(username)
+    if info is not None:
+        _cache_stats["hits"] += 1
         logger.debug(f"⚡ Данные пользователя @{username} из кеша")
-        return cached[1]
+        return info
+    if username in _negative_cache:
+        _cache_stats["negative_hits"] += 1
+        logger.debug(f"⚡ @{username} не найден (из кеша)")
+        return None
+
+    task = _inflight.get(username)
+    if task is not None:
+        _cache_stats["coalesced"] += 1
+    else:
+        _cache_stats["misses"] += 1
+        task = asyncio.create_task(_load_user(username))
+        _inflight[username] = task
+        task.add_done_callback(lambda _: _inflight.pop(username, None))
+
+    # shield: отмена одного ожидающего не должна отменять загрузку для остальных
+    return await asyncio.shield(task)
+
+
+def _store(username: str, info: Optional[dict]):
+    if info is None:
+        _negative_cache[username] = True
+        _user_cache.pop(username, None)
+    else:
+        _user_cache[username] = info
+        _negative_cache.pop(username, None)
 
+
+async def _load_user(username: str) -> Optional[dict]:
+    generation = _generation
     logger.debug(f"🔍 Запрос к БД о пользователе @{username}")
+    info = (await _fetch_users([username])).get(username)
+    if info is None:
+        logger.info(f"🙅 Пользователь @{username} не найден")
+    else:
+        logger.info(f"✅ Пользователь @{username} найден: {info['full_name']} | Роли: {info['roles']}")
+    if generation == _generation:
+        _store(username, info)
+    return info
 
-    conn = await get_async_connection()
-    try:
-        row = await conn.fetchrow(
-            "SELECT id, full_name, is_active FROM users WHERE username = $1", username
-        )
-        if not row:
-            logger.info(f"🙅 Пользователь @{username} не найден")
-            return None
-
-        roles = await conn.fetch(
-            """
-            SELECT r.name FROM user_roles ur
-            JOIN roles r ON ur.role_id = r.id
-            WHERE ur.user_id = $1
-            """,
-            row["id"]
-        )
-        role_names = [r["name"] for r in roles]
 
-        result = {
-            "full_name": row["full_name"],
-            "roles": role_names,
-            "is_active": row["is_active"]
-        }
+async def get_users_info(usernames: list[str]) -> dict[str, Optional[dict]]:
+    """
+    Пакетный вариант get_user_info: записи берутся из снимка прав и кешей,
+    остальные пользователи загружаются одним запросом.
 
-        logger.info(f"✅ Пользователь @{username} найден: {row['full_name']} | Роли: {role_names}")
-        _user_cache[username] = (now, result)
-        return result
-    finally:
-        await conn.close()
+    :return: {username: данные или None, если пользователь не найден}
+    """
+    snapshot = _snapshot
+    result: dict[str, Optional[dict]] = {}
+    missing = []
+    for username in dict.fromkeys(u for u in usernames if u):
+        if snapshot is not None and username in snapshot.users:
+            _snapshot_stats["hits"] += 1
+            result[username] = snapshot.users[username]
+        elif username in _user_cache:
+            _cache_stats["hits"] += 1
+            result[username] = _user_cache[username]
+        elif username in _negative_cache:
+            _cache_stats["negative_hits"] += 1
+            result[username] = None
+        else:
+            missing.append(username)
+
+    if missing:
+        _cache_stats["misses"] += len(missing)
+        logger.debug(f"🔍 Пакетный запрос к БД: {len(missing)} пользователей")
+        generation = _generation
+        found = await _fetch_users(missing)
+        for username in missing:
+            result[username] = found.get(username)
+            if generation == _generation:
+                _store(username, result[username])
+    return result
+
+
+def invalidate_users(usernames: Iterable[str]) -> int:
+    """
+    Сбрасывает кешированные записи указанных пользователей (найденных и ненайденных).
+    Вызывается синхронизацией для пользователей, чьи права изменились.
+
+    :return: сколько записей удалено
+    """
+    global _generation
+    _generation += 1
+    removed = 0
+    for username in usernames:
+        removed += _user_cache.pop(username, None) is not None
+        removed += _negative_cache.pop(username, None) is not None
+    _cache_stats["invalidated"] += removed
+    if removed:
+        logger.info(f"🧹 Сброшено записей кеша прав: {removed}")
+    return removed
 
 
 def clear_user_info_cache():
     """
     Ручной сброс кеша пользователей.
     """
+    global _generation
+    _generation += 1
     _user_cache.clear()
+    _negative_cache.clear()
     logger.info("🧹 Кеш user_info сброшен вручную")
 
 
+def get_user_cache_stats() -> dict:
+    lookups = _cache_stats["hits"] + _cache_stats["negative_hits"] + _cache_stats["misses"] + _cache_stats["coalesced"]
+    return {
+        **_cache_stats,
+        "size": len(_user_cache),
+        "negative_size": len(_negative_cache),
+        "maxsize": AUTH_CACHE_SIZE,
+        "ttl": AUTH_CACHE_TTL,
+        "negative_ttl": AUTH_NEGATIVE_TTL,
+        "hit_rate": (_cache_stats["hits"] + _cache_stats["negative_hits"]) / lookups if lookups else 0.0,
+    }
+
+
 async def has_role(username: str, role: str) -> bool:
     info = await get_user_info(username)
     result = info is not None and role in info["roles"]
@@ -0,0 +1,150 @@
+# telegram_bot/services/auth_notify.py
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Iterable
+
+from telegram_bot.app.config import AUTH_NOTIFY_CHANNEL, AUTH_LISTENER_PING
+from telegram_bot.services.access_control import (
+    apply_user_changes,
+    has_auth_snapshot,
+    invalidate_users,
+    refresh_auth_snapshot,
+)
+from telegram_bot.services.database import acquire_connection
+from telegram_bot.services.resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+# Полезная нагрузка NOTIFY ограничена 8000 байт — usernames шлём пачками
+_MAX_PAYLOAD_BYTES = 7000
+# Метка процесса: свои же оповещения слушатель пропускает
+_ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+_listener_task: asyncio.Task | None = None
+# Ссылки на задачи обновления, чтобы их не собрал сборщик мусора
+_apply_tasks: set[asyncio.Task] = set()
+_listener_stats = {"connected": False, "received": 0, "published": 0, "reconnects": 0, "errors": 0}
+
+
+def _chunk_payloads(usernames: list[str]) -> list[str]:
+    payloads, chunk = [], []
+    for username in usernames:
+        candidate = json.dumps({"origin": _ORIGIN, "usernames": chunk + [username]}, ensure_ascii=False)
+        if chunk and len(candidate.encode("utf-8")) > _MAX_PAYLOAD_BYTES:
+            payloads.append(json.dumps({"origin": _ORIGIN, "usernames": chunk}, ensure_ascii=False))
+            chunk = []
+        chunk.append(username)
+    if chunk:
+        payloads.append(json.dumps({"origin": _ORIGIN, "usernames": chunk}, ensure_ascii=False))
+    return payloads
+
+
+async def publish_user_changes(usernames: Iterable[str]):
+    """
+    Оповещает все процессы бота об изменении прав указанных пользователей
+    через pg_notify в канал AUTH_NOTIFY_CHANNEL.
+    """
+    usernames = sorted(set(usernames))
+    if not usernames:
+        return
+    payloads = _chunk_payloads(usernames)
+    async with acquire_connection() as conn:
+        for payload in payloads:
+            await conn.execute("SELECT pg_notify($1, $2)", AUTH_NOTIFY_CHANNEL, payload)
+    _listener_stats["published"] += len(usernames)
+    logger.info(f"📣 Оповещение об изменении прав: {len(usernames)} пользователей, {len(payloads)} сообщений")
+
+
+def _on_notification(connection, pid, channel, payload):
+    try:
+        message = json.loads(payload)
+        usernames = message["usernames"]
+    except (ValueError, KeyError, TypeError):
+        logger.warning(f"⚠️ Непонятное оповещение в канале {channel}: {payload[:200]}")
+        return
+    if message.get("origin") == _ORIGIN:
+        return
+    _listener_stats["received"] += len(usernames)
+    logger.info(f"📨 Права изменились в другом процессе: {len(usernames)} пользователей")
+    # Колбэк синхронный — перечитываем пользователей отдельной задачей
+    task = asyncio.get_running_loop().create_task(_apply(usernames))
+    _apply_tasks.add(task)
+    task.add_done_callback(_apply_tasks.discard)
+
+
+async def _apply(usernames: list[str]):
+    try:
+        await apply_user_changes(usernames)
+    except Exception as e:
+        _listener_stats["errors"] += 1
+        # Не смогли перечитать — хотя бы не отдаём устаревшее из кеша
+        invalidate_users(usernames)
+        logger.error(f"❌ Не удалось обновить права по оповещению: {e}")
+
+
+async def _listen_forever():
+    attempt = 0
+    first = True
+    while True:
+        try:
+            # Соединение держится всё время работы и не возвращается в пул
+            async with acquire_connection() as conn:
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(AUTH_NOTIFY_CHANNEL, _on_notification)
+                _listener_stats["connected"] = True
+                logger.info(f"👂 Слушаем оповещения о правах в канале {AUTH_NOTIFY_CHANNEL}")
+                if not first or not has_auth_snapshot():
+                    # Пока соединения не было, оповещения могли потеряться
+                    changed = await refresh_auth_snapshot()
+                    invalidate_users(changed)
+                first, attempt = False, 0
+                try:
+                    while not lost.is_set():
+                        try:
+                            await asyncio.wait_for(lost.wait(), AUTH_LISTENER_PING)
+                        except asyncio.TimeoutError:
+                            await conn.fetchval("SELECT 1")
+                finally:
+                    _listener_stats["connected"] = False
+                    if not conn.is_closed():
+                        await conn.remove_listener(AUTH_NOTIFY_CHANNEL, _on_notification)
+            logger.warning("⚠️ Соединение слушателя оповещений о правах закрыто")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _listener_stats["errors"] += 1
+            logger.error(f"❌ Слушатель оповещений о правах: {e}")
+
+        _listener_stats["reconnects"] += 1
+        attempt += 1
+        await asyncio.sleep(backoff_delay(attempt, base=1.0, cap=30.0))
+
+
+async def start_auth_listener():
+    """
+    Запускает фоновый слушатель LISTEN на отдельном соединении из пула.
+    При обрыве переподключается и пересобирает снимок прав целиком.
+    """
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen_forever())
+
+
+async def stop_auth_listener():
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+
+
+def get_auth_listener_stats() -> dict:
+    return {**_listener_stats, "channel": AUTH_NOTIFY_CHANNEL}
@@ -0,0 +1,206 @@
+# telegram_bot/services/card_api.py
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+import aiohttp
+from cachetools import TTLCache
+
+from telegram_bot.app.config import (
+    QR_API_URL,
+    QR_API_KEY,
+    QR_API_TIMEOUT,
+    QR_API_DEADLINE,
+    QR_API_MAX_RETRIES,
+    QR_API_RETRY_RATIO,
+    QR_API_BACKOFF_BASE,
+    QR_API_BACKOFF_CAP,
+    QR_API_BREAKER_THRESHOLD,
+    QR_API_BREAKER_RECOVERY,
+    QR_API_HEDGE_PERCENTILE,
+    CARD_CACHE_TTL,
+    CARD_CACHE_SIZE,
+)
+from telegram_bot.services.http_client import get_http_session
+from telegram_bot.services.resilience import (
+    CircuitBreaker,
+    RetryBudget,
+    LatencyTracker,
+    backoff_delay,
+    hedged,
+)
+
+logger = logging.getLogger(__name__)
+
+# Таймаут одной попытки; общий срок на все попытки — QR_API_DEADLINE
+_API_TIMEOUT = aiohttp.ClientTimeout(total=QR_API_TIMEOUT)
+# Хеджирование включается, когда накоплено достаточно замеров латентности
+_HEDGE_MIN_SAMPLES = 20
+
+_breaker = CircuitBreaker("card_api", QR_API_BREAKER_THRESHOLD, QR_API_BREAKER_RECOVERY)
+_retry_budget = RetryBudget(ratio=QR_API_RETRY_RATIO, min_retries=3, window=60)
+_latency = LatencyTracker()
+_api_stats = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "errors": 0}
+
+# Кеш ответов API: {card_number: (fetched_at, data)}; ошибки не кешируем
+_card_cache: TTLCache = TTLCache(maxsize=CARD_CACHE_SIZE, ttl=CARD_CACHE_TTL)
+# Запросы «в полёте»: параллельные сканы одной карты ждут один и тот же запрос
+_inflight: dict[str, asyncio.Task] = {}
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+
+@dataclass
+class CardLookup:
+    data: dict | None
+    cached: bool = False
+    age: float = 0.0  # возраст данных в секундах
+
+
+class _ClientSideError(Exception):
+    """Ответ 4xx: апстрим жив, повторять бессмысленно."""
+
+
+async def _request_once(card_number: str) -> dict:
+    params = {"cardNumber": card_number, "apikey": QR_API_KEY}
+    started = time.monotonic()
+    session = get_http_session()
+    async with session.get(QR_API_URL, params=params, timeout=_API_TIMEOUT) as response:
+        if 400 <= response.status < 500 and response.status != 429:
+            raise _ClientSideError(f"HTTP {response.status}")
+        response.raise_for_status()
+        data = await response.json()
+    _latency.add(time.monotonic() - started)
+    return data
+
+
+async def _request(card_number: str) -> dict:
+    """
+    Одна попытка; если она дольше перцентиля QR_API_HEDGE_PERCENTILE —
+    параллельно отправляется хедж-запрос. Хедж — такая же лишняя нагрузка,
+    как повтор: он тратит бюджет повторов и отправляется только при закрытом
+    предохранителе.
+    """
+    if QR_API_HEDGE_PERCENTILE <= 0 or len(_latency) < _HEDGE_MIN_SAMPLES:
+        return await _request_once(card_number)
+
+    def allow_hedge() -> bool:
+        if _breaker.state != CircuitBreaker.CLOSED or not _retry_budget.try_acquire_retry():
+            return False
+        _api_stats["hedges"] += 1
+        return True
+
+    data, hedge_won = await hedged(
+        lambda: _request_once(card_number),
+        delay=_latency.percentile(QR_API_HEDGE_PERCENTILE),
+        allow_hedge=allow_hedge,
+    )
+    if hedge_won:
+        _api_stats["hedge_wins"] += 1
+    return data
+
+
+async def fetch_card_info(card_number: str) -> dict | None:
+    """
+    Запрашивает баланс и историю карты через общую HTTP-сессию.
+
+    Пока предохранитель открыт, сразу возвращает None. Временные ошибки
+    (таймауты, обрывы, 5xx, 429) повторяются с джиттером в пределах бюджета
+    повторов и общего срока QR_API_DEADLINE.
+    """
+    if not _breaker.allow():
+        logger.warning(f"⛔ API карт недоступно (предохранитель открыт), карта {card_number}")
+        return None
+
+    _api_stats["requests"] += 1
+    _retry_budget.record_request()
+    attempt = 0
+    try:
+        async with asyncio.timeout(QR_API_DEADLINE):
+            while True:
+                try:
+                    data = await _request(card_number)
+                    _breaker.record_success()
+                    return data
+                except _ClientSideError as e:
+                    _breaker.record_success()
+                    logger.error(f"Ошибка при запросе к API: {e}")
+                    _api_stats["errors"] += 1
+                    return None
+                except (aiohttp.ClientError, TimeoutError) as e:
+                    _breaker.record_failure()
+                    logger.warning(f"Ошибка при запросе к API (попытка {attempt + 1}): {e!r}")
+
+                if attempt >= QR_API_MAX_RETRIES or not _breaker.allow() or not _retry_budget.try_acquire_retry():
+                    break
+                attempt += 1
+                _api_stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt, QR_API_BACKOFF_BASE, QR_API_BACKOFF_CAP))
+    except TimeoutError:
+        logger.error(f"⌛ API карт не ответило за {QR_API_DEADLINE} с")
+        _breaker.record_failure()
+
+    _api_stats["errors"] += 1
+    logger.error(f"❌ Не удалось получить данные карты {card_number}")
+    return None
+
+
+def is_card_api_available() -> bool:
+    return _breaker.state != CircuitBreaker.OPEN
+
+
+def get_card_api_health() -> dict:
+    return {
+        **_api_stats,
+        "breaker": _breaker.snapshot(),
+        "retry_budget": _retry_budget.snapshot(),
+        "latency_p50": _latency.percentile(0.50),
+        "latency_p95": _latency.percentile(0.95),
+        "hedge_after": _latency.percentile(QR_API_HEDGE_PERCENTILE) if QR_API_HEDGE_PERCENTILE > 0 else None,
+    }
+
+
+async def _load_and_cache(card_number: str) -> dict | None:
+    data = await fetch_card_info(card_number)
+    if data is not None:
+        _card_cache[card_number] = (time.monotonic(), data)
+    return data
+
+
+async def get_card_info(card_number: str) -> CardLookup:
+    """
+    Возвращает данные карты из короткоживущего кеша или из API.
+    Параллельные запросы одной и той же карты объединяются в один.
+    """
+    cached = _card_cache.get(card_number)
+    if cached is not None:
+        _stats["hits"] += 1
+        fetched_at, data = cached
+        logger.debug(f"⚡ Карта {card_number} из кеша")
+        return CardLookup(data=data, cached=True, age=time.monotonic() - fetched_at)
+
+    task = _inflight.get(card_number)
+    if task is not None:
+        _stats["coalesced"] += 1
+        logger.debug(f"🔗 Карта {card_number}: присоединяемся к запросу в полёте")
+    else:
+        _stats["misses"] += 1
+        task = asyncio.create_task(_load_and_cache(card_number))
+        _inflight[card_number] = task
+        task.add_done_callback(lambda _: _inflight.pop(card_number, None))
+
+    # shield: отмена одного ожидающего не должна отменять запрос для остальных
+    data = await asyncio.shield(task)
+    return CardLookup(data=data)
+
+
+def get_card_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"] + _stats["coalesced"]
+    return {
+        **_stats,
+        "size": len(_card_cache),
+        "maxsize": CARD_CACHE_SIZE,
+        "ttl": CARD_CACHE_TTL,
+        "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+    }
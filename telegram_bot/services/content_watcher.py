@@ -0,0 +1,164 @@
+# telegram_bot/services/content_watcher.py
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from telegram_bot.app.config import CONTENT_RELOAD_INTERVAL
+from telegram_bot.services import text_service, image_cache, sheets_cache
+from telegram_bot.services.sync_scheduler import sync_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WatchTarget:
+    name: str
+    directory: str
+    match: Callable[[str], bool]
+    # (изменённые, удалённые) -> реально обновлённые файлы
+    reload: Callable[[set[str], set[str]], Awaitable[list[str]]]
+
+
+async def _reload_fixed_roles(changed: set[str], removed: set[str]) -> list[str]:
+    if sheets_cache.reload_fixed_roles():
+        logger.info("📦 fixed_roles.json изменился — запускаем синхронизацию")
+        sync_scheduler.wake()
+        return [os.path.basename(sheets_cache.FIXED_ROLES_PATH)]
+    return []
+
+
+TARGETS = (
+    WatchTarget(
+        "fixed_roles",
+        os.path.dirname(sheets_cache.FIXED_ROLES_PATH),
+        lambda filename: filename == os.path.basename(sheets_cache.FIXED_ROLES_PATH),
+        _reload_fixed_roles,
+    ),
+    WatchTarget(
+        "text_blocks",
+        text_service.BASE_PATH,
+        lambda filename: filename.endswith(".md"),
+        text_service.reload_text_blocks,
+    ),
+    WatchTarget(
+        "img",
+        image_cache.IMG_DIR,
+        lambda filename: filename.lower().endswith(image_cache.IMAGE_EXTENSIONS),
+        image_cache.reload_images,
+    ),
+)
+
+# Последний увиденный (mtime_ns, размер) каждого файла: {target: {filename: stamp}}
+_stamps: dict[str, dict[str, tuple[int, int]]] = {}
+_watcher_task: asyncio.Task | None = None
+_watch_stats = {"scans": 0, "reloads": 0, "files": 0, "failures": 0}
+_last_reload: dict | None = None
+
+
+def _scan(target: WatchTarget) -> dict[str, tuple[int, int]]:
+    stamps = {}
+    try:
+        with os.scandir(target.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and target.match(entry.name):
+                    st = entry.stat()
+                    stamps[entry.name] = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        pass
+    return stamps
+
+
+async def check_content() -> list[str]:
+    """
+    Один проход опроса: сравнивает mtime и размеры файлов с прошлым проходом
+    и перезагружает только изменившиеся файлы своих кешей.
+
+    :return: перезагруженные файлы
+    """
+    global _last_reload
+    _watch_stats["scans"] += 1
+    reloaded = []
+    for target in TARGETS:
+        current = await asyncio.to_thread(_scan, target)
+        previous = _stamps.get(target.name)
+        if previous is None:
+            _stamps[target.name] = current
+            continue
+        changed = {name for name, stamp in current.items() if previous.get(name) != stamp}
+        removed = previous.keys() - current.keys()
+        if not changed and not removed:
+            continue
+
+        started = time.monotonic()
+        try:
+            affected = await target.reload(changed, removed)
+        except Exception as e:
+            _watch_stats["failures"] += 1
+            logger.error(f"❌ Не удалось перезагрузить {target.name}: {e}")
+            continue
+        _stamps[target.name] = current
+        if not affected:
+            continue
+
+        # Задержка от последней записи в файл до подмены кеша
+        newest = max((current[name][0] for name in changed), default=time.time_ns())
+        lag = max(0.0, time.time() - newest / 1e9)
+        seconds = time.monotonic() - started
+        _watch_stats["reloads"] += 1
+        _watch_stats["files"] += len(affected)
+        _last_reload = {"target": target.name, "files": affected, "seconds": seconds, "lag": lag, "at": time.time()}
+        logger.info(
+            f"♻️ {target.name}: перезагружено {', '.join(affected)} за {seconds * 1000:.1f} мс "
+            f"(через {lag:.2f} с после изменения)"
+        )
+        reloaded += affected
+    return reloaded
+
+
+async def _watch_forever():
+    while True:
+        try:
+            await check_content()
+        except Exception as e:
+            _watch_stats["failures"] += 1
+            logger.error(f"❌ Ошибка опроса файлов контента: {e}")
+        await asyncio.sleep(CONTENT_RELOAD_INTERVAL)
+
+
+async def start_content_watcher():
+    """
+    Запускает опрос fixed_roles.json, text_blocks и img раз в CONTENT_RELOAD_INTERVAL секунд.
+    Первый проход запоминает текущее состояние файлов — вызывать после предзагрузки кешей.
+    """
+    global _watcher_task
+    if CONTENT_RELOAD_INTERVAL <= 0:
+        logger.info("♻️ Горячая перезагрузка контента выключена")
+        return
+    if _watcher_task is None or _watcher_task.done():
+        await check_content()
+        _watcher_task = asyncio.create_task(_watch_forever())
+
+
+async def stop_content_watcher():
+    global _watcher_task
+    if _watcher_task is not None:
+        _watcher_task.cancel()
+        try:
+            await _watcher_task
+        except asyncio.CancelledError:
+            pass
+        _watcher_task = None
+
+
+def get_content_watcher_stats() -> dict:
+    return {
+        **_watch_stats,
+        "enabled": CONTENT_RELOAD_INTERVAL > 0,
+        "interval": CONTENT_RELOAD_INTERVAL,
+        "files_watched": sum(len(stamps) for stamps in _stamps.values()),
+        "last": dict(_last_reload) if _last_reload else None,
+    }
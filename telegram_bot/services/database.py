@@ -1,24 +1,130 @@
 # telegram_bot/services/database.py
 
 import os
+import time
+import asyncio
 import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
 import asyncpg
 import psycopg2
 from dotenv import load_dotenv
 
+from telegram_bot.app.config import (
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_ACQUIRE_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_POOL_MAX_QUERIES,
+    DB_POOL_MAX_INACTIVE_LIFETIME,
+)
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-# 🔄 Асинхронное подключение
+# Пул соединений asyncpg на всё время жизни приложения
+_pool: asyncpg.Pool | None = None
+_pool_lock = asyncio.Lock()
+_acquire_waits: deque[float] = deque(maxlen=500)
+_pool_stats = {"acquired": 0, "saturated": 0, "timeouts": 0}
+
+
+def _connect_kwargs() -> dict:
+    return dict(
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", 5432)
+    )
+
+
+async def init_db_pool(**pool_kwargs) -> asyncpg.Pool:
+    """
+    Создаёт пул соединений. Вызывается при старте бота; дополнительные
+    аргументы передаются в asyncpg.create_pool (например, init или server_settings).
+    """
+    global _pool
+    async with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = await asyncpg.create_pool(
+                    **_connect_kwargs(),
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+                    max_queries=DB_POOL_MAX_QUERIES,
+                    max_inactive_connection_lifetime=DB_POOL_MAX_INACTIVE_LIFETIME,
+                    **pool_kwargs
+                )
+            except Exception:
+                logger.exception("❌ Ошибка создания пула asyncpg")
+                raise
+            logger.info(f"🛢️ Пул БД создан: {DB_POOL_MIN_SIZE}..{DB_POOL_MAX_SIZE} соединений")
+    return _pool
+
+
+async def close_db_pool():
+    """
+    Закрывает пул соединений. Вызывается при остановке бота.
+    """
+    global _pool
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+            logger.info("🛢️ Пул БД закрыт")
+
+
+@asynccontextmanager
+async def acquire_connection():
+    """
+    Берёт соединение из пула (создаёт пул лениво, если его ещё нет)
+    и учитывает время ожидания свободного соединения.
+
+    :raises asyncio.TimeoutError: если соединение не освободилось за DB_POOL_ACQUIRE_TIMEOUT
+    """
+    pool = _pool or await init_db_pool()
+    if pool.get_idle_size() == 0 and pool.get_size() >= pool.get_max_size():
+        _pool_stats["saturated"] += 1
+
+    started = time.monotonic()
+    try:
+        conn = await pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _pool_stats["timeouts"] += 1
+        logger.error(f"⌛ Нет свободного соединения с БД за {DB_POOL_ACQUIRE_TIMEOUT} с")
+        raise
+    _acquire_waits.append(time.monotonic() - started)
+    _pool_stats["acquired"] += 1
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+def get_db_pool_stats() -> dict:
+    waits = sorted(_acquire_waits)
+    size = _pool.get_size() if _pool else 0
+    idle = _pool.get_idle_size() if _pool else 0
+    return {
+        **_pool_stats,
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+        "wait_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+        "wait_max": waits[-1] if waits else 0.0,
+    }
+
+
+# 🔄 Отдельное асинхронное подключение (вне пула)
 async def get_async_connection():
     try:
-        conn = await asyncpg.connect(
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME"),
-            host=os.getenv("DB_HOST", "localhost"),
-            port=os.getenv("DB_PORT", 5432)
-        )
+        conn = await asyncpg.connect(**_connect_kwargs())
         logger.debug("⚡ Асинхронное соединение с БД установлено")
         return conn
     except Exception as e:
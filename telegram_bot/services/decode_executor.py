@@ -0,0 +1,187 @@
+# telegram_bot/services/decode_executor.py
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from telegram_bot.app.config import (
+    QR_DECODE_POOL,
+    QR_DECODE_WORKERS,
+    QR_DECODE_QUEUE_SIZE,
+    QR_DECODE_TIMEOUT,
+)
+from telegram_bot.services.qr_decode import warmup
+
+logger = logging.getLogger(__name__)
+
+_executor: Executor | None = None
+_pending = 0
+_pending_lock = threading.Lock()
+# Задачи, занимающие слот очереди: {future: пул, в который она отправлена}
+_slots: dict[Future, Executor] = {}
+_recycle_stats = {"recycled": 0, "timeouts": 0, "crashes": 0}
+
+
+class DecodeQueueFull(RuntimeError):
+    """Очередь декодирования переполнена — задачу не принимаем."""
+
+
+class DecodeTimeout(RuntimeError):
+    """Задача декодирования не уложилась в QR_DECODE_TIMEOUT."""
+
+
+class DecodeWorkerCrashed(RuntimeError):
+    """Воркер декодирования упал; пул уже пересоздан, задачу можно повторить."""
+
+
+def _create_executor() -> Executor:
+    if QR_DECODE_POOL == "process":
+        # spawn, а не fork: процесс бота к этому моменту уже многопоточный
+        return ProcessPoolExecutor(
+            max_workers=QR_DECODE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return ThreadPoolExecutor(max_workers=QR_DECODE_WORKERS, thread_name_prefix="qr-decode")
+
+
+async def start_decode_executor():
+    """
+    Создаёт пул декодирования и прогревает все воркеры.
+    """
+    global _executor
+    if _executor is not None:
+        return
+
+    _executor = _create_executor()
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(_executor, warmup) for _ in range(QR_DECODE_WORKERS)
+    ))
+    logger.info(
+        f"🧵 Пул декодирования QR запущен: {QR_DECODE_POOL} x{QR_DECODE_WORKERS}, "
+        f"очередь {QR_DECODE_QUEUE_SIZE}, таймаут {QR_DECODE_TIMEOUT} с"
+    )
+
+
+async def shutdown_decode_executor():
+    """
+    Останавливает пул, отменяя задачи, которые ещё не начали выполняться.
+    """
+    global _executor
+    if _executor is None:
+        return
+    executor, _executor = _executor, None
+    await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+    logger.info("🧵 Пул декодирования QR остановлен")
+
+
+def _terminate_workers(processes: list):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def _recycle_executor(stale: Executor, reason: str):
+    """
+    Заменяет пул stale новым, если он ещё текущий: сколько бы задач ни упало
+    с одного и того же пула, пересоздаётся он один раз.
+
+    Слоты задач старого пула освобождаются сразу — очередь принимает новые сканы,
+    не дожидаясь зависших воркеров. Старый пул дорабатывает начатые задачи,
+    а через QR_DECODE_TIMEOUT его воркеры завершаются принудительно: к этому
+    моменту ответа от них уже никто не ждёт.
+    """
+    global _executor, _pending
+    if _executor is not stale:
+        return
+    _executor = _create_executor()
+    _recycle_stats["recycled"] += 1
+    logger.warning(f"♻️ Пул декодирования пересоздан: {reason}")
+
+    with _pending_lock:
+        for future in [f for f, executor in _slots.items() if executor is stale]:
+            del _slots[future]
+            _pending -= 1
+
+    # В ProcessPoolExecutor нет публичного способа убить воркер (до Python 3.14),
+    # а shutdown() забывает список процессов — запоминаем его заранее
+    processes = list((getattr(stale, "_processes", None) or {}).values())
+    stale.shutdown(wait=False, cancel_futures=True)
+    if processes:
+        asyncio.get_running_loop().call_later(QR_DECODE_TIMEOUT, _terminate_workers, processes)
+
+
+def _release_slot(future: Future):
+    global _pending
+    with _pending_lock:
+        if _slots.pop(future, None) is not None:
+            _pending -= 1
+
+
+def get_decode_stats() -> dict:
+    return {
+        "pool": QR_DECODE_POOL,
+        "workers": QR_DECODE_WORKERS,
+        "queue_size": QR_DECODE_QUEUE_SIZE,
+        "pending": _pending,
+        **_recycle_stats,
+    }
+
+
+async def run_decode(func: Callable[..., Any], *args) -> Any:
+    """
+    Выполняет CPU-задачу в пуле декодирования.
+
+    Слот очереди освобождается, когда воркер закончил работу. Задача, не уложившаяся
+    в таймаут, выводит свой пул из работы вместе со всеми его слотами (см. _recycle_executor).
+
+    :raises DecodeQueueFull: если в работе уже QR_DECODE_QUEUE_SIZE задач
+    :raises DecodeTimeout: если задача не уложилась в QR_DECODE_TIMEOUT (пул пересоздаётся)
+    :raises DecodeWorkerCrashed: если воркер упал (пул пересоздаётся)
+    """
+    global _pending
+    if _executor is None:
+        await start_decode_executor()
+
+    executor = _executor
+    with _pending_lock:
+        if _pending >= QR_DECODE_QUEUE_SIZE:
+            raise DecodeQueueFull(f"в очереди декодирования {_pending} задач")
+        _pending += 1
+
+    try:
+        cf = executor.submit(func, *args)
+    except BrokenProcessPool as e:
+        with _pending_lock:
+            _pending -= 1
+        _recycle_stats["crashes"] += 1
+        _recycle_executor(executor, "пул сломан")
+        raise DecodeWorkerCrashed("пул декодирования сломан") from e
+    except BaseException:
+        with _pending_lock:
+            _pending -= 1
+        raise
+    with _pending_lock:
+        _slots[cf] = executor
+    cf.add_done_callback(_release_slot)
+
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(cf), timeout=QR_DECODE_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Начатую задачу cancel() не остановит: зависший воркер держал бы слот и процесс,
+        # поэтому пул с ним выводим из работы
+        if not cf.cancel():
+            _recycle_stats["timeouts"] += 1
+            _recycle_executor(executor, f"задача дольше {QR_DECODE_TIMEOUT} с")
+        raise DecodeTimeout(f"декодирование дольше {QR_DECODE_TIMEOUT} с")
+    except asyncio.CancelledError:
+        cf.cancel()
+        raise
+    except BrokenProcessPool as e:
+        _recycle_stats["crashes"] += 1
+        _recycle_executor(executor, "воркер упал")
+        raise DecodeWorkerCrashed("воркер декодирования упал") from e
@@ -0,0 +1,66 @@
+# telegram_bot/services/http_client.py
+
+import logging
+
+import aiohttp
+
+from telegram_bot.app.config import (
+    HTTP_POOL_LIMIT,
+    HTTP_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_TOTAL_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Общая сессия на всё время жизни приложения
+_session: aiohttp.ClientSession | None = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def start_http_client():
+    """
+    Создаёт общую HTTP-сессию. Вызывается при старте бота.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.info(
+            f"🌐 HTTP-клиент запущен: лимит {HTTP_POOL_LIMIT} "
+            f"({HTTP_LIMIT_PER_HOST} на хост), DNS-кеш {HTTP_DNS_CACHE_TTL} с"
+        )
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую HTTP-сессию. Если её ещё нет (например, при запуске
+    сервиса как отдельного скрипта), создаёт лениво.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+        logger.debug("🌐 HTTP-сессия создана лениво")
+    return _session
+
+
+async def close_http_client():
+    """
+    Закрывает общую HTTP-сессию. Вызывается при остановке бота.
+    """
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("🌐 HTTP-клиент остановлен")
+    _session = None
@@ -1,46 +1,202 @@
 # telegram_bot/services/image_cache.py
 
 import os
+import asyncio
+import hashlib
 import logging
-from aiogram.types import FSInputFile
+from dataclasses import dataclass
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from telegram_bot.services.snapshot_store import CACHE_DIR, read_json, write_json_atomic
 
 logger = logging.getLogger(__name__)
 
 # Путь к директории с изображениями
 IMG_DIR = os.path.join(os.path.dirname(__file__), "..", "domain", "img")
 
-# Кеш картинок: {filename: FSInputFile}
-_image_cache: dict[str, FSInputFile] = {}
+# Поддерживаемые расширения изображений
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# file_id, которые Telegram выдал после загрузки: {"<bot_id>:<sha256 файла>": file_id}.
+# file_id привязан к боту, поэтому ключ включает его id; изменённый файл получает
+# новый хэш и загружается заново
+FILE_IDS_PATH = os.path.join(CACHE_DIR, "telegram_file_ids.json")
+
+# Ошибки Telegram, означающие, что сохранённый file_id больше не действителен
+_STALE_FILE_ID_ERRORS = ("wrong file identifier", "file reference")
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    filename: str
+    path: str
+    sha256: str
+    size: int
+
+
+# Кеш картинок: {filename: CachedImage}
+_image_cache: dict[str, CachedImage] = {}
+_file_ids: dict[str, str] = {}
+# Загрузки «в полёте»: параллельные первые отправки одного файла ждут одну загрузку
+_uploads: dict[str, asyncio.Task] = {}
+_image_stats = {"by_file_id": 0, "uploads": 0, "uploaded_bytes": 0, "stale_file_ids": 0, "coalesced": 0}
+
+
+def _read_image(filename: str) -> CachedImage:
+    path = os.path.join(IMG_DIR, filename)
+    with open(path, "rb") as f:
+        data = f.read()
+    return CachedImage(filename, path, hashlib.sha256(data).hexdigest(), len(data))
+
+
+async def _load_file_ids():
+    global _file_ids
+    try:
+        payload = await read_json(FILE_IDS_PATH)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Не удалось прочитать file_id изображений: {e}")
+        return
+    _file_ids = dict(payload or {})
+
+
+async def _save_file_ids():
+    # file_id прошлых версий файлов больше не понадобятся
+    hashes = {image.sha256 for image in _image_cache.values()}
+    for key in [key for key in _file_ids if key.split(":", 1)[-1] not in hashes]:
+        del _file_ids[key]
+    try:
+        await write_json_atomic(FILE_IDS_PATH, _file_ids)
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось сохранить file_id изображений: {e}")
 
 
 async def preload_images():
     """
-    Предзагружает изображения из IMG_DIR в кеш.
+    Предзагружает изображения из IMG_DIR в кеш (путь и хэш содержимого)
+    и поднимает сохранённые file_id прошлых загрузок в Telegram.
     """
     global _image_cache
-    _image_cache = {}
+    await _load_file_ids()
 
     if not os.path.isdir(IMG_DIR):
+        _image_cache = {}
         logger.warning(f"❌ Каталог изображений не найден: {IMG_DIR}")
         return
 
+    images = {}
     for filename in os.listdir(IMG_DIR):
-        if not filename.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
             continue
 
-        filepath = os.path.join(IMG_DIR, filename)
         try:
-            _image_cache[filename] = FSInputFile(filepath)
+            images[filename] = await asyncio.to_thread(_read_image, filename)
             logger.info(f"🖼️ Изображение загружено в кеш: {filename}")
         except Exception as e:
             logger.warning(f"❌ Ошибка при загрузке изображения {filename}: {e}")
+    _image_cache = images
 
 
-def get_image(filename: str) -> FSInputFile | None:
+async def reload_images(changed: set[str], removed: set[str]) -> list[str]:
     """
-    Получает FSInputFile из кеша по имени файла.
+    Обновляет в кеше только изменившиеся изображения и подменяет кеш целиком.
+    У изменённого файла новый хэш — при следующей отправке он загрузится заново.
+
+    :return: имена файлов, которые действительно обновлены или удалены
+    """
+    global _image_cache
+    images = dict(_image_cache)
+    affected = []
+    for filename in sorted(changed):
+        try:
+            image = await asyncio.to_thread(_read_image, filename)
+        except Exception as e:
+            logger.warning(f"❌ Ошибка при загрузке изображения {filename}: {e}")
+            continue
+        previous = images.get(filename)
+        images[filename] = image
+        if previous is None or previous.sha256 != image.sha256:
+            affected.append(filename)
+    for filename in sorted(removed):
+        if images.pop(filename, None) is not None:
+            affected.append(filename)
+    _image_cache = images
+    return affected
+
+
+def _file_id_key(bot_id: int, image: CachedImage) -> str:
+    return f"{bot_id}:{image.sha256}"
+
+
+async def _send_by_file_id(message: Message, image: CachedImage, key: str, kwargs: dict) -> Message | None:
+    file_id = _file_ids.get(key)
+    if not file_id:
+        return None
+    try:
+        sent = await message.answer_photo(photo=file_id, **kwargs)
+    except TelegramBadRequest as e:
+        # Остальные ошибки (подпись, разметка, чат) повторная загрузка не исправит
+        if not any(error in e.message.lower() for error in _STALE_FILE_ID_ERRORS):
+            raise
+        _image_stats["stale_file_ids"] += 1
+        logger.warning(f"⚠️ file_id изображения {image.filename} не принят ({e}), загружаем файл заново")
+        if _file_ids.get(key) == file_id:
+            _file_ids.pop(key, None)
+        return None
+    _image_stats["by_file_id"] += 1
+    return sent
+
+
+async def _upload(message: Message, image: CachedImage, key: str, kwargs: dict) -> Message:
+    sent = await message.answer_photo(photo=FSInputFile(image.path), **kwargs)
+    _image_stats["uploads"] += 1
+    _image_stats["uploaded_bytes"] += image.size
+    if sent.photo:
+        # Самый большой размер — исходное изображение
+        _file_ids[key] = sent.photo[-1].file_id
+        logger.info(f"🖼️ {image.filename} загружено в Telegram ({image.size / 1024:.0f} КБ), file_id сохранён")
+        await _save_file_ids()
+    return sent
+
+
+async def send_image(message: Message, filename: str, **kwargs) -> Message | None:
+    """
+    Отправляет изображение в чат message. Первая отправка загружает файл,
+    file_id из ответа Telegram сохраняется и дальше отправляется вместо файла.
+    Параллельные первые отправки ждут одну загрузку и затем шлют её file_id.
+    Если Telegram не принял сохранённый file_id, файл загружается заново.
+
+    :return: отправленное сообщение или None, если изображения нет в кеше
     """
     image = _image_cache.get(filename)
     if image is None:
         logger.warning(f"⚠️ Изображение {filename} не найдено в кеше.")
-    return image
+        return None
+
+    key = _file_id_key(message.bot.id, image)
+    sent = await _send_by_file_id(message, image, key, kwargs)
+    if sent is not None:
+        return sent
+
+    # Загрузка в полёте: ждём её (не отменяя при своей отмене) и отправляем её file_id
+    while (task := _uploads.get(key)) is not None:
+        _image_stats["coalesced"] += 1
+        await asyncio.wait([task])
+        sent = await _send_by_file_id(message, image, key, kwargs)
+        if sent is not None:
+            return sent
+
+    task = asyncio.create_task(_upload(message, image, key, kwargs))
+    _uploads[key] = task
+    task.add_done_callback(lambda t: _uploads.pop(key, None) if _uploads.get(key) is t else None)
+    # shield: отмена этого хендлера не должна обрывать загрузку, которую ждут остальные
+    return await asyncio.shield(task)
+
+
+def get_image_cache_stats() -> dict:
+    return {
+        **_image_stats,
+        "images": len(_image_cache),
+        "file_ids": len(_file_ids),
+    }
@@ -0,0 +1,157 @@
+# telegram_bot/services/qr_decode.py
+
+import re
+import time
+import logging
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+from pyzbar.pyzbar import decode
+
+# ⚠️ Функции модуля выполняются в рабочих процессах пула декодирования:
+# здесь только чистые CPU-функции, сам модуль не импортирует aiogram, конфигурацию и asyncio.
+# Воркеры при этом не «лёгкие»: под spawn каждый заново импортирует
+# telegram_bot.app.main (как __mp_main__) вместе с aiogram и конфигурацией.
+
+logger = logging.getLogger(__name__)
+
+# Доля кадра, которую оставляем при обрезке по центру (карта обычно в центре снимка)
+ROI_FRACTION = 0.7
+
+# Дешёвые проходы — для любого разрешения; дорогие — только когда дешёвые не помогли
+CHEAP_STAGES = ("gray_roi", "gray")
+HEAVY_STAGES = ("adaptive", "sharpen", "rotate")
+ALL_STAGES = CHEAP_STAGES + HEAVY_STAGES
+
+_SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+
+# Детектор OpenCV создаётся один раз на процесс-воркер
+_cv_detector: cv2.QRCodeDetector | None = None
+
+
+@dataclass
+class DecodeOutcome:
+    qr_text: str | None = None
+    stage: str | None = None
+    backend: str | None = None
+    # Время работы каждого опробованного движка, секунды
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def extract_card_number(qr_data: str) -> str | None:
+    match = re.search(r"f_persAcc=(\d+)", qr_data)
+    return match.group(1) if match else None
+
+
+def warmup() -> bool:
+    """
+    Пустая задача для прогрева воркера: импорт cv2/pyzbar происходит при старте,
+    а не на первом скане.
+    """
+    return True
+
+
+def _crop_center(gray: np.ndarray, fraction: float = ROI_FRACTION) -> np.ndarray:
+    h, w = gray.shape[:2]
+    dh, dw = int(h * (1 - fraction) / 2), int(w * (1 - fraction) / 2)
+    return gray[dh:h - dh, dw:w - dw]
+
+
+def _rotate(gray: np.ndarray, angle: float) -> np.ndarray:
+    h, w = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), borderValue=255)
+
+
+def _stage_images(gray: np.ndarray, stage: str) -> list[np.ndarray]:
+    if stage == "gray_roi":
+        return [_crop_center(gray)]
+    if stage == "gray":
+        return [gray]
+    if stage == "adaptive":
+        return [cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 5
+        )]
+    if stage == "sharpen":
+        return [cv2.filter2D(gray, -1, _SHARPEN_KERNEL)]
+    if stage == "rotate":
+        return [_rotate(gray, angle) for angle in (45, -45, 20, -20)]
+    raise ValueError(f"Неизвестная стадия декодирования: {stage}")
+
+
+def _decode_pyzbar(img: np.ndarray) -> list[str]:
+    return [d.data.decode("utf-8", errors="replace") for d in decode(img)]
+
+
+def _decode_opencv(img: np.ndarray) -> list[str]:
+    global _cv_detector
+    if _cv_detector is None:
+        _cv_detector = cv2.QRCodeDetector()
+    try:
+        ok, decoded_info, _, _ = _cv_detector.detectAndDecodeMulti(img)
+    except cv2.error as e:
+        # Бывает на вырожденных кадрах — считаем, что движок ничего не нашёл
+        logger.warning(f"⚠️ OpenCV не смог обработать кадр {img.shape}: {e}")
+        return []
+    if not ok:
+        return []
+    return [text for text in decoded_info if text]
+
+
+# Движки распознавания: имя -> функция(изображение) -> список текстов найденных кодов
+BACKENDS = {
+    "pyzbar": _decode_pyzbar,
+    "opencv": _decode_opencv,
+}
+
+
+def _pick_payload(payloads: list[str]) -> str | None:
+    """
+    Из нескольких найденных кодов предпочитаем тот, в котором есть номер карты.
+    """
+    for payload in payloads:
+        if extract_card_number(payload):
+            return payload
+    return payloads[0] if payloads else None
+
+
+def decode_qr_cascade(
+    data: bytes,
+    stages: tuple[str, ...] = ALL_STAGES,
+    backends: tuple[str, ...] = ("pyzbar",),
+) -> DecodeOutcome:
+    """
+    Декодирует изображение из байтов сразу в оттенки серого и прогоняет каскад стадий.
+    На каждой стадии вариант кадра готовится один раз и отдаётся движкам по порядку
+    (основной, затем запасные): дешёвая стадия запасного движка идёт раньше дорогих
+    стадий основного. Каскад останавливается на первом QR с номером карты;
+    QR без f_persAcc запоминается как запасной ответ.
+    """
+    outcome = DecodeOutcome()
+    img_array = np.frombuffer(data, np.uint8)
+    gray = cv2.imdecode(img_array, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return outcome
+
+    for stage in stages:
+        for variant in _stage_images(gray, stage):
+            for backend in backends:
+                started = time.perf_counter()
+                payloads = BACKENDS[backend](variant)
+                outcome.timings[backend] = outcome.timings.get(backend, 0.0) + time.perf_counter() - started
+                if not payloads:
+                    continue
+                qr_text = _pick_payload(payloads)
+                if outcome.qr_text is None or extract_card_number(qr_text):
+                    outcome.qr_text, outcome.stage, outcome.backend = qr_text, stage, backend
+                if extract_card_number(qr_text):
+                    return outcome
+    return outcome
+
+
+def decode_qr_bytes(data: bytes) -> str | None:
+    """
+    Декодирует изображение из байтов и возвращает текст первого найденного QR-кода.
+    """
+    return decode_qr_cascade(data).qr_text
@@ -0,0 +1,184 @@
+# telegram_bot/services/qr_scan.py
+
+import logging
+from collections import deque
+from dataclasses import dataclass, replace
+
+from aiogram import Bot
+from aiogram.types import PhotoSize
+from cachetools import LRUCache
+
+from telegram_bot.app.config import (
+    QR_CASCADE_MIN_SIDE,
+    SCAN_RESULT_CACHE_SIZE,
+    QR_DECODER_BACKENDS,
+)
+from telegram_bot.services.decode_executor import run_decode, DecodeTimeout
+from telegram_bot.services.qr_decode import (
+    decode_qr_cascade, extract_card_number, DecodeOutcome, BACKENDS, CHEAP_STAGES, ALL_STAGES
+)
+
+logger = logging.getLogger(__name__)
+
+_unknown_backends = set(QR_DECODER_BACKENDS) - set(BACKENDS)
+if _unknown_backends or not QR_DECODER_BACKENDS:
+    raise RuntimeError(f"❌ Неизвестные движки в QR_DECODER_BACKENDS: {sorted(_unknown_backends)}")
+
+
+@dataclass
+class ScanResult:
+    qr_text: str | None
+    card_number: str | None = None
+    stage: str | None = None  # например "320x240/gray_roi"
+    backend: str | None = None
+    bytes_downloaded: int = 0
+    attempts: int = 0
+    timed_out: bool = False
+    from_cache: bool = False
+
+
+class _CountingLRUCache(LRUCache):
+    """LRU-кеш, который считает вытеснения по размеру."""
+
+    evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+# Результаты распознавания по file_unique_id самой большой рендиции,
+# включая отрицательные (QR не найден) — повторная пересылка того же фото
+# не скачивается и не декодируется заново
+_scan_cache: _CountingLRUCache = _CountingLRUCache(maxsize=SCAN_RESULT_CACHE_SIZE)
+_scan_stats = {"hits": 0, "misses": 0}
+
+# Счётчики по движкам распознавания: попытки, успехи, латентность
+_LATENCY_SAMPLES = 500
+_backend_stats = {
+    name: {"attempts": 0, "successes": 0, "latencies": deque(maxlen=_LATENCY_SAMPLES)}
+    for name in QR_DECODER_BACKENDS
+}
+
+
+def _record_outcome(outcome: DecodeOutcome):
+    for backend, seconds in outcome.timings.items():
+        stats = _backend_stats[backend]
+        stats["attempts"] += 1
+        stats["latencies"].append(seconds)
+        if outcome.backend == backend and outcome.qr_text and extract_card_number(outcome.qr_text):
+            stats["successes"] += 1
+
+
+async def decode_image(data: bytes, stages: tuple[str, ...]) -> DecodeOutcome:
+    """
+    Распознаёт одно изображение движками из QR_DECODER_BACKENDS по очереди:
+    следующий движок пробуется, только если предыдущие не нашли f_persAcc.
+    """
+    outcome = await run_decode(decode_qr_cascade, data, stages, QR_DECODER_BACKENDS)
+    _record_outcome(outcome)
+    return outcome
+
+
+def get_decoder_stats() -> dict:
+    result = {"backends": {}}
+    for name, stats in _backend_stats.items():
+        latencies = sorted(stats["latencies"])
+        result["backends"][name] = {
+            "attempts": stats["attempts"],
+            "successes": stats["successes"],
+            "success_rate": stats["successes"] / stats["attempts"] if stats["attempts"] else 0.0,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+            "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        }
+    return result
+
+
+def _cascade_renditions(photos: list[PhotoSize]) -> list[PhotoSize]:
+    """
+    Выбирает рендиции для каскада: от самой маленькой пригодной к самой большой.
+    Совсем мелкие превью (меньше QR_CASCADE_MIN_SIDE по короткой стороне) пропускаем.
+    """
+    ordered = sorted(photos, key=lambda p: p.width * p.height)
+    usable = [p for p in ordered if min(p.width, p.height) >= QR_CASCADE_MIN_SIDE]
+    if not usable or usable[-1] is not ordered[-1]:
+        usable.append(ordered[-1])
+    return usable
+
+
+async def _download(bot: Bot, photo: PhotoSize) -> bytes:
+    file = await bot.get_file(photo.file_id)
+    file_bytes = await bot.download_file(file.file_path)
+    return file_bytes.read()
+
+
+async def scan_photo(bot: Bot, photos: list[PhotoSize]) -> ScanResult:
+    """
+    Распознаёт QR на фото, используя кеш результатов по file_unique_id.
+    """
+    key = max(photos, key=lambda p: p.width * p.height).file_unique_id
+    cached = _scan_cache.get(key)
+    if cached is not None:
+        _scan_stats["hits"] += 1
+        logger.info(f"⚡ Фото {key} уже распознавалось: стадия={cached.stage or 'нет'}")
+        return replace(cached, bytes_downloaded=0, attempts=0, from_cache=True)
+
+    _scan_stats["misses"] += 1
+    result = await _scan_cascade(bot, photos)
+    # Таймаут — временная проблема, такой отрицательный результат не запоминаем
+    if not result.timed_out or result.qr_text:
+        _scan_cache[key] = result
+    return result
+
+
+def get_scan_cache_stats() -> dict:
+    lookups = _scan_stats["hits"] + _scan_stats["misses"]
+    return {
+        **_scan_stats,
+        "size": len(_scan_cache),
+        "maxsize": _scan_cache.maxsize,
+        "evictions": _scan_cache.evictions,
+        "hit_rate": _scan_stats["hits"] / lookups if lookups else 0.0,
+    }
+
+
+async def _scan_cascade(bot: Bot, photos: list[PhotoSize]) -> ScanResult:
+    """
+    Каскадное распознавание QR: сначала маленькая рендиция в оттенках серого
+    с обрезкой по центру, затем всё более крупные; дорогие стадии предобработки
+    (адаптивный порог, резкость, поворот) — только на самой большой рендиции.
+
+    DecodeQueueFull пробрасывается наверх: при перегрузке дальше по каскаду не идём.
+    """
+    renditions = _cascade_renditions(photos)
+    result = ScanResult(qr_text=None)
+
+    for index, photo in enumerate(renditions):
+        is_last = index == len(renditions) - 1
+        stages = ALL_STAGES if is_last else CHEAP_STAGES
+
+        data = await _download(bot, photo)
+        result.bytes_downloaded += len(data)
+        result.attempts += 1
+
+        try:
+            outcome = await decode_image(data, stages)
+        except DecodeTimeout:
+            logger.warning(f"⌛ Таймаут декодирования на рендиции {photo.width}x{photo.height}")
+            result.timed_out = True
+            continue
+
+        if outcome.qr_text:
+            result.qr_text = outcome.qr_text
+            result.card_number = extract_card_number(outcome.qr_text)
+            result.stage = f"{photo.width}x{photo.height}/{outcome.stage}"
+            result.backend = outcome.backend
+            break
+
+    logger.info(
+        f"🧩 Каскад QR: стадия={result.stage or 'нет'}, движок={result.backend or 'нет'}, "
+        f"попыток={result.attempts}, "
+        f"скачано={result.bytes_downloaded} байт"
+    )
+    return result
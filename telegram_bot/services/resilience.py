@@ -0,0 +1,200 @@
+# telegram_bot/services/resilience.py
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для внешнего API.
+
+    closed    — запросы идут как обычно, считаем подряд идущие ошибки;
+    open      — после `failure_threshold` ошибок подряд сразу отказываем,
+                не нагружая больной апстрим;
+    half_open — через `recovery_timeout` секунд пропускаем `half_open_max`
+                пробных запросов: успех закрывает предохранитель, ошибка — снова открывает.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_max: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max = half_open_max
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._half_open_since = 0.0
+        self._half_open_in_flight = 0
+        self.stats = {"rejected": 0, "opened": 0, "successes": 0, "failures": 0}
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"⚡ Предохранитель {self.name}: {self.state} → {state}")
+        self.state = state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+            self.stats["opened"] += 1
+        if state == self.HALF_OPEN:
+            self._half_open_since = time.monotonic()
+        self._half_open_in_flight = 0
+
+    def allow(self) -> bool:
+        """
+        Можно ли сейчас отправить запрос. В half_open занимает пробный слот.
+        """
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.recovery_timeout:
+            self._transition(self.HALF_OPEN)
+        # Пробный запрос мог быть отменён и не сообщить результат — не зависаем в half_open
+        if self.state == self.HALF_OPEN and now - self._half_open_since >= self.recovery_timeout:
+            self._half_open_since = now
+            self._half_open_in_flight = 0
+
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and self._half_open_in_flight < self.half_open_max:
+            self._half_open_in_flight += 1
+            return True
+
+        self.stats["rejected"] += 1
+        return False
+
+    def record_success(self):
+        self.stats["successes"] += 1
+        self.consecutive_failures = 0
+        self._transition(self.CLOSED)
+
+    def record_failure(self):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(self.OPEN)
+
+    def snapshot(self) -> dict:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": retry_in,
+            **self.stats,
+        }
+
+
+class RetryBudget:
+    """
+    Бюджет повторов: за скользящее окно повторов может быть не больше
+    `ratio` от числа запросов (но не меньше `min_retries`). Так повторы
+    не умножают нагрузку на апстрим, когда он и так деградирует.
+    """
+
+    def __init__(self, ratio: float, min_retries: int, window: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self.exhausted = 0
+
+    def _trim(self, now: float):
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self):
+        now = time.monotonic()
+        self._trim(now)
+        self._requests.append(now)
+
+    def try_acquire_retry(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        allowed = max(self.min_retries, int(len(self._requests) * self.ratio))
+        if len(self._retries) >= allowed:
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+    def snapshot(self) -> dict:
+        self._trim(time.monotonic())
+        return {
+            "requests": len(self._requests),
+            "retries": len(self._retries),
+            "exhausted": self.exhausted,
+        }
+
+
+class LatencyTracker:
+    """Скользящее окно латентностей для перцентилей (порог хеджирования)."""
+
+    def __init__(self, samples: int = 200):
+        self._latencies: deque[float] = deque(maxlen=samples)
+
+    def add(self, seconds: float):
+        self._latencies.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def percentile(self, p: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Экспоненциальная задержка с полным джиттером."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: float,
+                 allow_hedge: Callable[[], bool] | None = None) -> tuple[T, bool]:
+    """
+    Хеджированный запрос: если первый вызов не ответил за `delay` секунд,
+    параллельно запускается второй; берём первый успешный ответ, второй отменяем.
+    Если `allow_hedge` вернул False, второй вызов не запускается и ждём первый.
+
+    :return: (результат, победил ли хедж-запрос)
+    """
+    primary = asyncio.create_task(call())
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result(), False
+
+        if allow_hedge is not None and not allow_hedge():
+            return await primary, False
+        hedge = asyncio.create_task(call())
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), task is hedge
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+    except BaseException:
+        primary.cancel()
+        raise
@@ -0,0 +1,181 @@
+# telegram_bot/services/roster_sync.py
+
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from telegram_bot.services.database import acquire_connection
+
+logger = logging.getLogger(__name__)
+
+ROLE_NAMES = ("operator", "consultant", "admin", "operator_rent")
+
+# Ключ advisory-блокировки синхронизации ростера ("pglbsync" в ASCII)
+SYNC_LOCK_KEY = 0x70676C6273796E63
+
+
+@dataclass(frozen=True)
+class RosterEntry:
+    username: str
+    full_name: str
+    roles: tuple[str, ...]
+
+
+@dataclass
+class SyncReport:
+    entries: int = 0
+    users_inserted: int = 0
+    users_updated: int = 0
+    roles_added: int = 0
+    roles_removed: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"записей {self.entries}, пользователи +{self.users_inserted} ~{self.users_updated}, "
+            f"роли +{self.roles_added} -{self.roles_removed} за {self.seconds:.2f} с"
+        )
+
+
+def resolve_roster(data: dict, fixed_roles: dict) -> dict[str, RosterEntry]:
+    """
+    Сводит данные Google Sheets и fixed_roles.json в итоговый ростер:
+    username -> ФИО и роли. Фиксированная роль заменяет роли из таблиц;
+    люди без ролей в ростер не попадают.
+    """
+    operator_fios = set(data["operators"])
+    consultant_fios = set(data["consultants"])
+    operator_rent_fios = {r["full_name"] for r in data["operators_rent"]}
+    phone_map = {p["full_name"]: p["username"] for p in data["phones"]}
+
+    for r in data["operators_rent"]:
+        phone_map[r["full_name"]] = r["username"]
+
+    for username, (fio, _) in fixed_roles.items():
+        phone_map[fio] = username
+
+    logger.info(f"📱 Пользователи: {len(phone_map)}, 🏠 арендаторы: {len(operator_rent_fios)}")
+
+    roster: dict[str, RosterEntry] = {}
+    for fio, username in phone_map.items():
+        roles = []
+        if username in fixed_roles:
+            roles = [fixed_roles[username][1]]
+        else:
+            if fio in operator_fios:
+                roles.append("operator")
+            if fio in consultant_fios:
+                roles.append("consultant")
+            if fio in operator_rent_fios:
+                roles.append("operator_rent")
+        if not roles:
+            continue
+        logger.debug(f"📥 {fio} ({username}) → {roles}")
+        roster[username] = RosterEntry(username, fio, tuple(dict.fromkeys(roles)))
+    return roster
+
+
+# Пользователи: вставляем новых, ФИО обновляем только там, где оно изменилось.
+# xmax = 0 у строки, которую вставили, а не обновили
+_UPSERT_USERS_SQL = """
+    INSERT INTO users (full_name, username)
+    SELECT DISTINCT full_name, username FROM roster_staging
+    ON CONFLICT (username) DO UPDATE SET full_name = EXCLUDED.full_name
+    WHERE users.full_name IS DISTINCT FROM EXCLUDED.full_name
+    RETURNING (xmax = 0) AS inserted
+"""
+
+# Роли пользователей из ростера, которых больше нет в таблицах.
+# Пользователей вне ростера не трогаем — их могли завести вручную
+_DELETE_ROLES_SQL = """
+    DELETE FROM user_roles ur
+    USING users u
+    WHERE ur.user_id = u.id
+      AND u.username IN (SELECT username FROM roster_staging)
+      AND NOT EXISTS (
+          SELECT 1 FROM roster_staging s
+          JOIN roles r ON r.name = s.role
+          WHERE s.username = u.username AND r.id = ur.role_id
+      )
+"""
+
+_INSERT_ROLES_SQL = """
+    INSERT INTO user_roles (user_id, role_id)
+    SELECT u.id, r.id
+    FROM roster_staging s
+    JOIN users u ON u.username = s.username
+    JOIN roles r ON r.name = s.role
+    ON CONFLICT DO NOTHING
+"""
+
+
+def _affected(status: str) -> int:
+    # asyncpg возвращает статус команды вида "INSERT 0 5" / "DELETE 3"
+    return int(status.rsplit(" ", 1)[-1])
+
+
+async def apply_roster(roster: dict[str, RosterEntry]) -> SyncReport:
+    """
+    Записывает ростер (или его дельту) в БД одной транзакцией: строки (ФИО, username, роль)
+    загружаются через COPY во временную таблицу, а users и user_roles
+    сверяются с ней несколькими множественными запросами.
+    """
+    started = time.monotonic()
+    records = [
+        (entry.full_name, entry.username, role)
+        for entry in roster.values()
+        for role in entry.roles
+    ]
+    report = SyncReport(entries=len(roster))
+
+    async with acquire_connection() as conn:
+        async with conn.transaction():
+            await conn.execute("""
+                CREATE TEMP TABLE roster_staging (
+                    full_name text NOT NULL,
+                    username text NOT NULL,
+                    role text NOT NULL
+                ) ON COMMIT DROP
+            """)
+            await conn.copy_records_to_table(
+                "roster_staging", records=records, columns=["full_name", "username", "role"]
+            )
+            await conn.execute("ANALYZE roster_staging")
+
+            await conn.execute(
+                """
+                INSERT INTO roles (name)
+                SELECT name FROM unnest($1::text[]) AS name
+                UNION
+                SELECT DISTINCT role FROM roster_staging
+                ON CONFLICT DO NOTHING
+                """,
+                list(ROLE_NAMES),
+            )
+
+            upserted = await conn.fetch(_UPSERT_USERS_SQL)
+            report.users_inserted = sum(1 for row in upserted if row["inserted"])
+            report.users_updated = len(upserted) - report.users_inserted
+            report.roles_removed = _affected(await conn.execute(_DELETE_ROLES_SQL))
+            report.roles_added = _affected(await conn.execute(_INSERT_ROLES_SQL))
+
+    report.seconds = time.monotonic() - started
+    return report
+
+
+@asynccontextmanager
+async def roster_sync_lock():
+    """
+    Сессионная advisory-блокировка Postgres на время синхронизации.
+    Не ждёт: отдаёт False, если блокировку держит другой процесс.
+    Держится на отдельном соединении и снимается при его закрытии,
+    так что упавший процесс не оставит блокировку навсегда.
+    """
+    async with acquire_connection() as conn:
+        acquired = await conn.fetchval("SELECT pg_try_advisory_lock($1)", SYNC_LOCK_KEY)
+        try:
+            yield acquired
+        finally:
+            if acquired and not conn.is_closed():
+                await conn.execute("SELECT pg_advisory_unlock($1)", SYNC_LOCK_KEY)
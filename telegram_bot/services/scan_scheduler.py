@@ -0,0 +1,136 @@
+# telegram_bot/services/scan_scheduler.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from telegram_bot.app.config import SCAN_MAX_CONCURRENT
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних ожиданий храним для перцентилей
+_WAIT_SAMPLES = 500
+
+
+class ScanSuperseded(Exception):
+    """Скан из очереди вытеснен более новым фото из того же чата."""
+
+
+@dataclass(eq=False)
+class _Ticket:
+    chat_id: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class ScanScheduler:
+    """
+    Допуск сканов к обработке:
+    - не больше `limit` сканов одновременно на весь бот;
+    - не больше одного активного скана на чат;
+    - в очереди от чата остаётся только самое новое фото, старое вытесняется.
+    Очередь — FIFO, но чат с активным сканом не блокирует тех, кто за ним.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active_chats: set[int] = set()
+        self._waiting: deque[_Ticket] = deque()
+        self._queued_by_chat: dict[int, _Ticket] = {}
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._stats = {"admitted": 0, "queued": 0, "superseded": 0, "max_depth": 0}
+
+    def _dispatch(self):
+        for ticket in list(self._waiting):
+            if len(self._active_chats) >= self.limit:
+                break
+            if ticket.chat_id in self._active_chats:
+                continue
+            self._waiting.remove(ticket)
+            self._queued_by_chat.pop(ticket.chat_id, None)
+            self._active_chats.add(ticket.chat_id)
+            ticket.future.set_result(None)
+
+    def _drop(self, ticket: _Ticket):
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+        if self._queued_by_chat.get(ticket.chat_id) is ticket:
+            del self._queued_by_chat[ticket.chat_id]
+
+    def _release(self, ticket: _Ticket):
+        self._active_chats.discard(ticket.chat_id)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, chat_id: int, on_queued: Callable[[int], Awaitable[None]] | None = None):
+        """
+        Ждёт свободный слот для скана.
+
+        :param on_queued: вызывается с позицией в очереди, если бот перегружен
+        :raises ScanSuperseded: если пока скан ждал, из чата пришло более новое фото
+        """
+        previous = self._queued_by_chat.get(chat_id)
+        if previous is not None:
+            self._drop(previous)
+            self._stats["superseded"] += 1
+            previous.future.set_exception(ScanSuperseded())
+
+        ticket = _Ticket(chat_id=chat_id, future=asyncio.get_running_loop().create_future())
+        self._waiting.append(ticket)
+        self._queued_by_chat[chat_id] = ticket
+        self._dispatch()
+
+        if not ticket.future.done():
+            self._stats["queued"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], len(self._waiting))
+            saturated = len(self._active_chats) >= self.limit
+            if on_queued is not None and saturated:
+                position = self._waiting.index(ticket) + 1
+                logger.info(f"⏳ Скан из чата {chat_id} в очереди: позиция {position}")
+                try:
+                    await on_queued(position)
+                except Exception as e:
+                    logger.warning(f"Не удалось сообщить позицию в очереди: {e}")
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            self._drop(ticket)
+            # Слот успели выдать, но ожидающий уже отменён — возвращаем слот
+            if ticket.future.done() and not ticket.future.cancelled() and ticket.future.exception() is None:
+                self._release(ticket)
+            raise
+
+        self._waits.append(time.monotonic() - ticket.enqueued_at)
+        self._stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            return waits[min(len(waits) - 1, int(len(waits) * p))] if waits else 0.0
+
+        return {
+            **self._stats,
+            "limit": self.limit,
+            "active": len(self._active_chats),
+            "depth": len(self._waiting),
+            "wait_p50": percentile(0.50),
+            "wait_p95": percentile(0.95),
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+
+scan_scheduler = ScanScheduler(SCAN_MAX_CONCURRENT)
+
+
+def get_scan_scheduler_stats() -> dict:
+    return scan_scheduler.stats()
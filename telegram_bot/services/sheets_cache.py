@@ -1,15 +1,27 @@
 # telegram_bot/services/sheets_cache.py
 import os
-import csv
 import json
+import time
 import asyncio
 import hashlib
-from io import StringIO
+from dataclasses import dataclass
 
 import aiohttp
+import aiofiles
 
 from telegram_bot.services.log_service import setup_logger
-from telegram_bot.services.database import get_sync_connection
+from telegram_bot.services.http_client import get_http_session, close_http_client
+from telegram_bot.services.database import close_db_pool
+from telegram_bot.services.sheets_connector import CHUNK_SIZE, stream_csv
+from telegram_bot.services.snapshot_store import CACHE_DIR, read_json, write_json_atomic, write_text_atomic
+from telegram_bot.services.access_control import (
+    apply_user_changes,
+    get_auth_snapshot,
+    refresh_auth_snapshot,
+    invalidate_users,
+)
+from telegram_bot.services.auth_notify import publish_user_changes
+from telegram_bot.services.roster_sync import RosterEntry, resolve_roster, apply_roster, roster_sync_lock
 from telegram_bot.app.config import (
     SPREADSHEET_ID_OPERATORS,
     SPREADSHEET_ID_CONSULTANTS,
@@ -19,40 +31,181 @@ from telegram_bot.app.config import (
     GID_CONSULTANTS,
     GID_PHONES,
     GID_OPERATORS_RENT,
+    SHEETS_FETCH_TIMEOUT,
+    SHEETS_EXPORT_BASE_URL,
 )
 
 logger = setup_logger()
 USE_SHEETS_CACHE = os.getenv("USE_SHEETS_CACHE", "false").lower() == "true"
-CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", ".cache")
 CACHE_FILE = os.path.join(CACHE_DIR, "sheets_data.json")
 HASH_FILE = os.path.join(CACHE_DIR, "sheets_hash.txt")
 FIXED_ROLES_PATH = os.path.join(os.path.dirname(__file__), "fixed_roles.json")
 
 
-def load_fixed_roles():
-    if not os.path.exists(FIXED_ROLES_PATH):
+# Кеш fixed_roles.json: файл перечитывается, только когда меняются его mtime или размер
+_fixed_roles: dict = {}
+_fixed_roles_stamp: tuple[int, int] | None = None
+
+
+def _fixed_roles_file_stamp() -> tuple[int, int] | None:
+    try:
+        st = os.stat(FIXED_ROLES_PATH)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def reload_fixed_roles() -> bool:
+    """
+    Перечитывает fixed_roles.json, если файл изменился, и пишет в лог только
+    отличия от прошлой версии. Файл с ошибкой (например, недописанный
+    при сохранении) не применяется — остаётся прошлая версия.
+
+    :return: изменились ли фиксированные роли
+    """
+    global _fixed_roles, _fixed_roles_stamp
+    stamp = _fixed_roles_file_stamp()
+    if stamp is not None and stamp == _fixed_roles_stamp:
+        return False
+    if stamp is None:
         logger.warning("⚠️ Файл fixed_roles.json не найден")
-        return {}
-    with open(FIXED_ROLES_PATH, "r", encoding="utf-8") as f:
-        raw = json.load(f)
-    logger.info("\n📦 FIXED_ROLES:")
-    for username, (fio, role) in raw.items():
-        logger.info(f"- {username}: {fio} → {role}")
-    return raw
-
-
-async def fetch_csv_text(spreadsheet_id: str, gid: int) -> str:
-    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv&gid={gid}"
-    logger.info(f"📡 Запрос данных с Google Sheets: {url}")
+        changed = bool(_fixed_roles)
+        _fixed_roles, _fixed_roles_stamp = {}, None
+        return changed
+
+    try:
+        with open(FIXED_ROLES_PATH, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"❌ Не удалось прочитать fixed_roles.json, оставляем прошлую версию: {e}")
+        return False
+
+    previous = _fixed_roles
+    _fixed_roles_stamp = stamp
+    if raw == previous:
+        return False
+    _fixed_roles = raw
+
+    if not previous:
+        logger.info(f"📦 FIXED_ROLES: {len(raw)} записей")
+        for username, (fio, role) in raw.items():
+            logger.debug(f"- {username}: {fio} → {role}")
+        return True
+    for username in sorted(raw.keys() | previous.keys()):
+        if username not in previous:
+            logger.info(f"📦 FIXED_ROLES + {username}: {raw[username][0]} → {raw[username][1]}")
+        elif username not in raw:
+            logger.info(f"📦 FIXED_ROLES - {username}")
+        elif raw[username] != previous[username]:
+            logger.info(f"📦 FIXED_ROLES ~ {username}: {raw[username][0]} → {raw[username][1]}")
+    return True
+
+
+def load_fixed_roles() -> dict:
+    reload_fixed_roles()
+    return _fixed_roles
+
+
+# Источники ростера: имя -> (ID таблицы, GID листа)
+SHEET_SOURCES = {
+    "operators": (SPREADSHEET_ID_OPERATORS, GID_OPERATORS),
+    "consultants": (SPREADSHEET_ID_CONSULTANTS, GID_CONSULTANTS),
+    "phones": (SPREADSHEET_ID_PHONES, GID_PHONES),
+    "operators_rent": (SPREADSHEET_ID_OPERATORS_RENT, GID_OPERATORS_RENT),
+}
+_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=SHEETS_FETCH_TIMEOUT)
+
+# Валидаторы последнего ответа по URL: {"etag", "last_modified"} —
+# с ними повторная выгрузка без изменений приходит как 304 без тела
+_validators: dict[str, dict] = {}
+
+
+@dataclass
+class SheetFetch:
+    name: str
+    rows: list[tuple] | None = None   # выбранные колонки непустых записей
+    hash: str = ""                    # MD5 сырого тела ответа
+    status: int | None = None
+    not_modified: bool = False
+    bytes: int = 0
+    seconds: float = 0.0
+
+
+def _export_url(spreadsheet_id: str, gid: int) -> str:
+    return f"{SHEETS_EXPORT_BASE_URL}/{spreadsheet_id}/export?format=csv&gid={gid}"
+
+
+async def fetch_sheet(name: str, spreadsheet_id: str, gid: int, columns: tuple[int, ...],
+                      conditional: bool = True) -> SheetFetch:
+    """
+    Загружает CSV одного листа через общую HTTP-сессию, при conditional — условным GET.
+    Тело разбирается потоком: в памяти остаются только нужные колонки,
+    хэш сырого содержимого считается по ходу чтения.
+    """
+    url = _export_url(spreadsheet_id, gid)
+    cached = _validators.get(url) if conditional else None
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    logger.info(f"📡 Запрос данных с Google Sheets ({name}): {url}")
+    result = SheetFetch(name)
+    started = time.monotonic()
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                text = await response.text(encoding="utf-8-sig")
-                return text
+        session = get_http_session()
+        async with session.get(url, headers=headers, timeout=_FETCH_TIMEOUT) as response:
+            if response.status == 304 and cached:
+                result.status, result.not_modified = 304, True
+                return result
+            response.raise_for_status()
+
+            hasher = hashlib.md5()
+
+            async def chunks():
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    hasher.update(chunk)
+                    result.bytes += len(chunk)
+                    yield chunk
+
+            rows = [row async for row in stream_csv(chunks(), columns)]
+            result.rows, result.hash, result.status = rows, hasher.hexdigest(), response.status
+            _validators[url] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            return result
     except Exception as e:
-        logger.error(f"❌ Ошибка при загрузке CSV с {url}: {e}")
-        return ""
+        logger.error(f"❌ Ошибка при загрузке CSV с {url}: {e!r}")
+        result.status, result.rows = None, None
+        return result
+    finally:
+        result.seconds = time.monotonic() - started
+
+
+async def fetch_all_sheets(revalidate: bool = True) -> dict[str, SheetFetch]:
+    """
+    Загружает все источники ростера параллельно и пишет в лог время и объём каждого.
+    Условный GET отправляется только для источников, чьи данные уже есть в памяти.
+    """
+    started = time.monotonic()
+    results = await asyncio.gather(*(
+        fetch_sheet(name, sid, gid, _PROJECTIONS[name][0],
+                    conditional=revalidate and name in _source_state)
+        for name, (sid, gid) in SHEET_SOURCES.items()
+    ))
+    for r in results:
+        if r.not_modified:
+            state = "304, не изменился"
+        elif r.status is None:
+            state = "ошибка"
+        else:
+            state = f"{r.status}, {r.bytes / 1024:.1f} КБ, {len(r.rows)} строк"
+        logger.info(f"📄 {r.name}: {state} за {r.seconds:.2f} с")
+    logger.info(f"🌐 Google Sheets загружены за {time.monotonic() - started:.2f} с")
+    return {r.name: r for r in results}
 
 
 def compute_hash(data: str) -> str:
@@ -72,48 +225,111 @@ def compute_diff(old: dict, new: dict) -> dict:
     return diff
 
 
-def parse_csv(csv_text: str) -> list[list[str]]:
-    reader = csv.reader(StringIO(csv_text))
-    return [row for row in reader if row and any(cell.strip() for cell in row)]
+def _project_names(rows: list[tuple]) -> list[str]:
+    return [row[0].strip() for row in rows]
 
 
-async def load_all_from_sheets(force_reload: bool = False) -> dict:
-    os.makedirs(CACHE_DIR, exist_ok=True)
+def _project_usernames(rows: list[tuple]) -> list[dict]:
+    return [
+        {"full_name": row[0].strip(), "username": row[1].strip().lstrip("@")}
+        for row in rows if row[1] and row[1].strip()
+    ]
+
+
+# Какие колонки нужны из каждого источника и как из них собрать данные
+_PROJECTIONS = {
+    "operators": ((0,), _project_names),
+    "consultants": ((0,), _project_names),
+    "phones": ((0, 2), _project_usernames),
+    "operators_rent": ((0, 3), _project_usernames),
+}
+
+# Последнее состояние каждого источника: {"hash": хэш сырого CSV, "data": выборка колонок}
+_source_state: dict[str, dict] = {}
+# Отпечаток источников и fixed_roles.json, успешно применённых к БД
+_applied_fingerprint = ""
+_source_stats = {"runs": 0, "skipped_runs": 0, "parsed": 0, "not_modified": 0, "same_hash": 0, "failed": 0}
+# Сколько источников не удалось загрузить в последнем запуске
+_last_failed_sources = 0
 
+
+@dataclass
+class SyncOutcome:
+    # "unchanged" — таблицы не менялись, "no_changes" — БД уже совпадает,
+    # "applied" — записаны изменения, "incomplete" — не хватает данных источников
+    status: str
+    changed_users: int = 0
+    failed_sources: int = 0
+
+
+async def load_sheet_sources(force_reload: bool = False) -> dict:
+    """
+    Загружает источники и пересобирает данные только тех, чьё сырое содержимое
+    изменилось (ответ 304 или тот же хэш CSV — берём прошлую выборку колонок).
+    Источник, который не удалось загрузить, сохраняет данные прошлой загрузки.
+    """
+    if force_reload:
+        _source_state.clear()
+    sheets = await fetch_all_sheets()
+
+    data, parsed = {}, []
+    counts = {"not_modified": 0, "same_hash": 0, "failed": 0}
+    for name, fetched in sheets.items():
+        previous = _source_state.get(name)
+        if fetched.status is None:
+            counts["failed"] += 1
+        if previous is not None and fetched.not_modified:
+            counts["not_modified"] += 1
+        elif fetched.status is None:
+            if previous is None:
+                # Прошлых данных нет: пустой лист отнял бы роли у всех из этого источника
+                data[name] = []
+                continue
+            logger.warning(f"⚠️ {name}: оставляем данные прошлой загрузки")
+        else:
+            if previous is not None and previous["hash"] == fetched.hash:
+                counts["same_hash"] += 1
+            else:
+                parsed.append(name)
+                _source_state[name] = {
+                    "hash": fetched.hash,
+                    "data": _PROJECTIONS[name][1](fetched.rows),
+                }
+        data[name] = _source_state[name]["data"]
+
+    global _last_failed_sources
+    _last_failed_sources = counts["failed"]
+    _source_stats["runs"] += 1
+    _source_stats["parsed"] += len(parsed)
+    for key, value in counts.items():
+        _source_stats[key] += value
+    logger.info(
+        f"🧮 Источники: разобрано {len(parsed)} ({', '.join(parsed) or '—'}), "
+        f"304: {counts['not_modified']}, тот же хэш: {counts['same_hash']}, ошибок: {counts['failed']}"
+    )
+    return data
+
+
+def _sources_fingerprint(fixed_roles: dict) -> str:
+    hashes = {name: state["hash"] for name, state in _source_state.items()}
+    hashes["fixed_roles"] = compute_hash(json.dumps(fixed_roles, sort_keys=True))
+    return compute_hash(json.dumps(hashes, sort_keys=True))
+
+
+async def load_all_from_sheets(force_reload: bool = False) -> dict:
     cached_data = {}
     old_hash = ""
-    if USE_SHEETS_CACHE and not force_reload and os.path.exists(CACHE_FILE) and os.path.exists(HASH_FILE):
+    if USE_SHEETS_CACHE and not force_reload:
         try:
-            with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                cached_data = json.load(f)
-            with open(HASH_FILE, "r", encoding="utf-8") as f:
-                old_hash = f.read().strip()
+            cached_data = await read_json(CACHE_FILE) or {}
+            if cached_data and os.path.exists(HASH_FILE):
+                async with aiofiles.open(HASH_FILE, "r", encoding="utf-8") as f:
+                    old_hash = (await f.read()).strip()
         except Exception as e:
             logger.warning(f"❌ Не удалось прочитать кеш: {e}")
 
     logger.info("🌐 Загружаем данные из Google Sheets")
-    operators_csv = await fetch_csv_text(SPREADSHEET_ID_OPERATORS, GID_OPERATORS)
-    consultants_csv = await fetch_csv_text(SPREADSHEET_ID_CONSULTANTS, GID_CONSULTANTS)
-    phones_csv = await fetch_csv_text(SPREADSHEET_ID_PHONES, GID_PHONES)
-    operators_rent_csv = await fetch_csv_text(SPREADSHEET_ID_OPERATORS_RENT, GID_OPERATORS_RENT)
-
-    operators = parse_csv(operators_csv)
-    consultants = parse_csv(consultants_csv)
-    phones = parse_csv(phones_csv)
-    operators_rent = parse_csv(operators_rent_csv)
-
-    fresh_data = {
-        "operators": [row[0].strip() for row in operators if row],
-        "consultants": [row[0].strip() for row in consultants if row],
-        "phones": [
-            {"full_name": row[0].strip(), "username": row[2].strip().lstrip("@")}
-            for row in phones if len(row) >= 3 and row[2].strip()
-        ],
-        "operators_rent": [
-            {"full_name": row[0].strip(), "username": row[3].strip().lstrip("@")}
-            for row in operators_rent if len(row) >= 4 and row[3].strip()
-        ]
-    }
+    fresh_data = await load_sheet_sources(force_reload=force_reload)
 
     combined_data = json.dumps(fresh_data, sort_keys=True)
     new_hash = compute_hash(combined_data)
@@ -129,75 +345,108 @@ async def load_all_from_sheets(force_reload: bool = False) -> dict:
             else:
                 logger.info("Данные изменились, но отличий не обнаружено.")
         try:
-            with open(CACHE_FILE, "w", encoding="utf-8") as f:
-                json.dump(fresh_data, f, ensure_ascii=False, indent=2)
-            with open(HASH_FILE, "w", encoding="utf-8") as f:
-                f.write(new_hash)
+            # Сначала данные, потом хэш: оборванная запись не даст «совпадения» со старыми данными
+            await write_json_atomic(CACHE_FILE, fresh_data)
+            await write_text_atomic(HASH_FILE, new_hash)
             logger.info("✅ Сохранили данные и хэш Google Sheets в локальный кеш")
         except Exception as e:
             logger.warning(f"❌ Не удалось сохранить кеш: {e}")
         return fresh_data
 
 
-async def sync_users_to_db_async(force_reload: bool = False):
+def compute_roster_delta(roster: dict[str, RosterEntry], current: dict) -> dict[str, RosterEntry]:
+    """
+    Оставляет из ростера только пользователей, которых нет в БД или у которых
+    изменились ФИО или набор ролей. Пользователи, пропавшие из таблиц,
+    в дельту не входят: синхронизация их не трогает.
+    """
+    desired = {
+        username: {"full_name": entry.full_name, "roles": sorted(entry.roles)}
+        for username, entry in roster.items()
+    }
+    existing = {
+        username: {"full_name": info["full_name"], "roles": sorted(info["roles"])}
+        for username, info in current.items()
+        if username in desired
+    }
+    diff = compute_diff(existing, desired)
+    return {username: roster[username] for username in diff}
+
+
+async def sync_users_to_db_async(force_reload: bool = False) -> SyncOutcome:
+    global _applied_fingerprint
     data = await load_all_from_sheets(force_reload=force_reload)
     fixed_roles = load_fixed_roles()
 
-    operator_fios = set(data["operators"])
-    consultant_fios = set(data["consultants"])
-    operator_rent_fios = {r["full_name"] for r in data["operators_rent"]}
-    phone_map = {p["full_name"]: p["username"] for p in data["phones"]}
-
-    for r in data["operators_rent"]:
-        phone_map[r["full_name"]] = r["username"]
-
-    for username, (fio, _) in fixed_roles.items():
-        phone_map[fio] = username
-
-    logger.info(f"📱 Пользователи: {phone_map}")
-    logger.info(f"🏠 Арендаторы: {operator_rent_fios}")
-
-    with get_sync_connection() as conn:
-        with conn.cursor() as cur:
-            for role in {"operator", "consultant", "admin", "operator_rent"}:
-                cur.execute(
-                    "INSERT INTO roles (name) VALUES (%s) ON CONFLICT DO NOTHING",
-                    (role,)
-                )
-            conn.commit()
-
-            for fio, username in phone_map.items():
-                roles = []
-                if username in fixed_roles:
-                    roles = [fixed_roles[username][1]]
-                else:
-                    if fio in operator_fios:
-                        roles.append("operator")
-                    if fio in consultant_fios:
-                        roles.append("consultant")
-                    if fio in operator_rent_fios:
-                        roles.append("operator_rent")
-                if not roles:
-                    continue
-                logger.info(f"📥 {fio} ({username}) → {roles}")
-                cur.execute("""
-                    INSERT INTO users (full_name, username)
-                    VALUES (%s, %s)
-                    ON CONFLICT (username) DO UPDATE SET full_name = EXCLUDED.full_name
-                    RETURNING id
-                """, (fio, username))
-                user_id = cur.fetchone()[0]
-                cur.execute("DELETE FROM user_roles WHERE user_id = %s", (user_id,))
-                for role in set(roles):
-                    cur.execute("SELECT id FROM roles WHERE name = %s", (role,))
-                    res = cur.fetchone()
-                    if not res:
-                        logger.warning(f"❗ Роль '{role}' не найдена")
-                        continue
-                    role_id = res[0]
-                    cur.execute(
-                        "INSERT INTO user_roles (user_id, role_id) VALUES (%s, %s)",
-                        (user_id, role_id)
-                    )
-        conn.commit()
-    logger.info("✅ Синхронизация завершена")
+    # Ни один источник и fixed_roles.json не изменились с последней успешной записи
+    fingerprint = _sources_fingerprint(fixed_roles)
+    if not force_reload and fingerprint == _applied_fingerprint:
+        _source_stats["skipped_runs"] += 1
+        logger.info(
+            f"💤 Таблицы не изменились — синхронизация пропущена "
+            f"(пропущено {_source_stats['skipped_runs']} из {_source_stats['runs']} запусков)"
+        )
+        return SyncOutcome("unchanged", failed_sources=_last_failed_sources)
+
+    missing = set(SHEET_SOURCES) - set(_source_state)
+    if missing:
+        logger.error(f"❌ Нет данных источников {sorted(missing)} — синхронизация отложена")
+        return SyncOutcome("incomplete", failed_sources=_last_failed_sources)
+
+    roster = resolve_roster(data, fixed_roles)
+
+    # Текущее состояние БД: одним запросом пересобираем снимок прав
+    invalidate_users(await refresh_auth_snapshot())
+    delta = compute_roster_delta(roster, get_auth_snapshot().users)
+    if not delta:
+        _applied_fingerprint = fingerprint
+        logger.info(f"✅ Синхронизация завершена: изменений нет ({len(roster)} в ростере)")
+        return SyncOutcome("no_changes", failed_sources=_last_failed_sources)
+
+    logger.info(f"🔀 Изменились права {len(delta)} из {len(roster)} пользователей: {sorted(delta)}")
+    report = await apply_roster(delta)
+    _applied_fingerprint = fingerprint
+    logger.info(f"✅ Синхронизация завершена: {report}")
+    await apply_user_changes(delta)
+    try:
+        await publish_user_changes(delta)
+    except Exception as e:
+        logger.error(f"❌ Не удалось разослать оповещение об изменении прав: {e}")
+    return SyncOutcome("applied", changed_users=len(delta), failed_sources=_last_failed_sources)
+
+
+async def run_exclusive_sync(force_reload: bool = False) -> SyncOutcome | None:
+    """
+    Синхронизация под advisory-блокировкой Postgres: одновременно ростер
+    пишет только один процесс (реплика бота или ручной запуск).
+
+    :return: результат или None, если синхронизацию уже выполняет другой процесс
+    """
+    async with roster_sync_lock() as acquired:
+        if not acquired:
+            logger.info("🔒 Синхронизацию уже выполняет другой процесс — пропускаем")
+            return None
+        return await sync_users_to_db_async(force_reload=force_reload)
+
+
+async def _main(force_reload: bool):
+    try:
+        outcome = await run_exclusive_sync(force_reload=force_reload)
+        if outcome is None:
+            raise SystemExit(1)
+        logger.info(f"🏁 Результат синхронизации: {outcome}")
+    finally:
+        await close_http_client()
+        await close_db_pool()
+
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Синхронизация пользователей из Google Sheets в БД")
+    parser.add_argument("--force-reload", action="store_true",
+                        help="игнорировать кеши и хэши источников, перечитать таблицы целиком")
+    args = parser.parse_args()
+    asyncio.run(_main(args.force_reload))
@@ -1,13 +1,79 @@
 # telegram_bot/services/sheets_connector.py
 
 import csv
-import aiohttp
+import codecs
 import asyncio
 import logging
-from io import StringIO
+from typing import AsyncIterator, Iterable
+
+from telegram_bot.services.http_client import get_http_session, close_http_client
+from telegram_bot.app.config import SHEETS_EXPORT_BASE_URL
 
 logger = logging.getLogger(__name__)
 
+# Размер куска, которым читается тело ответа
+CHUNK_SIZE = 64 * 1024
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], encoding: str = "utf-8-sig") -> AsyncIterator[str]:
+    """
+    Декодирует поток байтов по кускам и отдаёт строки вместе с переводом строки.
+    Многобайтовый символ на границе кусков собирает инкрементальный декодер.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    tail = ""
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        # Последняя строка может быть неполной — ждём следующий кусок
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[list[str]]:
+    """
+    Собирает строки в CSV-записи и разбирает их по одной.
+    Запись закончена, когда число кавычек в ней чётное: перевод строки
+    внутри поля в кавычках запись не завершает. Пустые строки пропускаются.
+    """
+    record: list[str] = []
+    quotes = 0
+    async for line in lines:
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        row = next(csv.reader(record), [])
+        record, quotes = [], 0
+        if row and any(cell.strip() for cell in row):
+            yield row
+    if record:
+        row = next(csv.reader(record), [])
+        if row and any(cell.strip() for cell in row):
+            yield row
+
+
+async def select_columns(rows: AsyncIterator[list[str]], columns: Iterable[int]) -> AsyncIterator[tuple]:
+    """
+    Оставляет от каждой записи только нужные колонки; отсутствующие — None.
+    """
+    columns = tuple(columns)
+    async for row in rows:
+        yield tuple(row[i] if i < len(row) else None for i in columns)
+
+
+def stream_csv(chunks: AsyncIterator[bytes], columns: Iterable[int] | None = None,
+               encoding: str = "utf-8-sig") -> AsyncIterator:
+    """
+    Конвейер потокового разбора: байты → строки → CSV-записи → (выборка колонок).
+    Пиковая память зависит от ширины одной записи, а не от размера листа.
+    """
+    rows = iter_csv_rows(iter_lines(chunks, encoding))
+    return select_columns(rows, columns) if columns is not None else rows
+
 
 async def fetch_csv(spreadsheet_id: str, gid: int) -> list[list[str]]:
     """
@@ -17,19 +83,16 @@ async def fetch_csv(spreadsheet_id: str, gid: int) -> list[list[str]]:
     :param gid: GID листа
     :return: Список строк (каждая строка — список ячеек)
     """
-    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv&gid={gid}"
+    url = f"{SHEETS_EXPORT_BASE_URL}/{spreadsheet_id}/export?format=csv&gid={gid}"
     logger.info(f"📡 Запрос данных с Google Sheets: {url}")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                content = await response.read()
-                csv_data = StringIO(content.decode("utf-8-sig"))
-                reader = csv.reader(csv_data)
-                rows = [row for row in reader if row and any(cell.strip() for cell in row)]
-                logger.info(f"✅ Получено {len(rows)} строк из GID={gid}")
-                return rows
+        session = get_http_session()
+        async with session.get(url) as response:
+            response.raise_for_status()
+            rows = [row async for row in stream_csv(response.content.iter_chunked(CHUNK_SIZE))]
+            logger.info(f"✅ Получено {len(rows)} строк из GID={gid}")
+            return rows
     except Exception as e:
         logger.error(f"❌ Ошибка при загрузке CSV из Google Sheets: {e}")
         return []
@@ -42,5 +105,6 @@ if __name__ == "__main__":
         rows = await fetch_csv(test_id, test_gid)
         for row in rows:
             print(row)
+        await close_http_client()
 
     asyncio.run(main())
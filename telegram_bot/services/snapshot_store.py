@@ -0,0 +1,115 @@
+# telegram_bot/services/snapshot_store.py
+
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Mapping
+
+import aiofiles
+import aiofiles.os
+
+from telegram_bot.app.config import AUTH_SNAPSHOT_PATH, AUTH_SNAPSHOT_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", ".cache")
+AUTH_SNAPSHOT_FILE = AUTH_SNAPSHOT_PATH
+
+# Версия формата файла: при несовпадении снимок игнорируется
+SNAPSHOT_FORMAT = 1
+
+# Записи в один и тот же файл не должны пересекаться
+_write_lock = asyncio.Lock()
+
+
+async def write_text_atomic(path: str, text: str) -> int:
+    """
+    Пишет текст во временный файл рядом с целевым и переименовывает его.
+    Читатель видит либо старый файл целиком, либо новый — без обрывков.
+
+    :return: размер записанных данных в байтах
+    """
+    data = text.encode("utf-8")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    async with _write_lock:
+        await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(data)
+            await f.flush()
+            await asyncio.to_thread(os.fsync, f.fileno())
+        await aiofiles.os.replace(tmp_path, path)
+    return len(data)
+
+
+async def write_json_atomic(path: str, payload) -> int:
+    """Компактный JSON без отступов, записанный атомарно."""
+    return await write_text_atomic(path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+
+async def read_json(path: str):
+    """
+    Читает JSON-файл без блокировки event loop. Нет файла — None.
+    """
+    try:
+        async with aiofiles.open(path, "r", encoding="utf-8") as f:
+            return json.loads(await f.read())
+    except FileNotFoundError:
+        return None
+
+
+async def save_auth_snapshot(users: Mapping[str, Mapping], version: int, built_at: float) -> int:
+    """
+    Сохраняет снимок прав на диск: {username: [ФИО, роли, активен]}.
+    """
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "built_at": built_at,
+        "saved_at": time.time(),
+        "users": {
+            username: [info["full_name"], list(info["roles"]), info["is_active"]]
+            for username, info in users.items()
+        },
+    }
+    return await write_json_atomic(AUTH_SNAPSHOT_FILE, payload)
+
+
+async def load_auth_snapshot() -> tuple[dict[str, dict], int, float] | None:
+    """
+    Загружает сохранённый снимок прав.
+
+    :return: (users, version, built_at) или None, если файла нет, он не подходит или устарел
+    """
+    try:
+        payload = await read_json(AUTH_SNAPSHOT_FILE)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Не удалось прочитать снимок прав с диска: {e}")
+        return None
+    if not payload:
+        return None
+    if not isinstance(payload, dict):
+        logger.warning("⚠️ Снимок прав на диске повреждён — не используем")
+        return None
+    if payload.get("format") != SNAPSHOT_FORMAT:
+        logger.warning(f"⚠️ Снимок прав на диске в формате {payload.get('format')}, ожидался {SNAPSHOT_FORMAT}")
+        return None
+    try:
+        built_at = float(payload["built_at"])
+        version = int(payload["version"])
+        users = {
+            username: {"full_name": full_name, "roles": list(roles), "is_active": bool(is_active)}
+            for username, (full_name, roles, is_active) in payload["users"].items()
+        }
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        logger.warning(f"⚠️ Снимок прав на диске повреждён ({e!r}) — не используем")
+        return None
+
+    age = time.time() - built_at
+    if age > AUTH_SNAPSHOT_MAX_AGE:
+        logger.warning(
+            f"⚠️ Снимок прав на диске собран {age:.0f} с назад (допустимо {AUTH_SNAPSHOT_MAX_AGE:.0f} с) — не используем"
+        )
+        return None
+    return users, version, built_at
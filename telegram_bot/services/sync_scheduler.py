@@ -0,0 +1,142 @@
+# telegram_bot/services/sync_scheduler.py
+
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, asdict
+
+from telegram_bot.app.config import (
+    INTERVAL_SYNC,
+    SYNC_INTERVAL_MIN,
+    SYNC_INTERVAL_MAX,
+    SYNC_BACKOFF_MAX,
+    SYNC_JITTER,
+)
+from telegram_bot.services.sheets_cache import run_exclusive_sync
+
+logger = logging.getLogger(__name__)
+
+# Во сколько раз меняется интервал после изменений и при стабильных данных
+_SHRINK = 0.5
+_GROW = 1.5
+
+
+@dataclass
+class SyncRun:
+    started_at: float       # time.time()
+    seconds: float
+    outcome: str            # статус SyncOutcome, "locked" или "failed"
+    changed_users: int = 0
+    error: str | None = None
+    next_in: float = 0.0    # через сколько секунд следующий запуск
+
+
+class SyncScheduler:
+    """
+    Планировщик синхронизации с Google Sheets.
+
+    - нашлись изменения — интервал сокращается (данные «в движении»);
+    - данные стабильны — интервал растёт до максимума;
+    - ошибка или недоступный источник — экспоненциальная задержка;
+    - синхронизацию держит другая реплика — интервал не меняется.
+    К каждому интервалу добавляется джиттер, чтобы реплики не просыпались разом.
+    """
+
+    def __init__(self, base: float, min_interval: float, max_interval: float,
+                 backoff_max: float, jitter: float, history: int = 20):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.interval = min(max(base, min_interval), max_interval)
+        self.failures = 0
+        self.history: deque[SyncRun] = deque(maxlen=history)
+        self.stats = {"runs": 0, "applied": 0, "unchanged": 0, "locked": 0, "failed": 0, "woken": 0}
+        # Внеочередной запуск (например, после правки fixed_roles.json)
+        self._wake = asyncio.Event()
+
+    def _next_delay(self, outcome: str, failed_sources: int) -> float:
+        if outcome in ("failed", "incomplete") or failed_sources:
+            self.failures += 1
+            delay = min(self.backoff_max, self.min_interval * 2 ** (self.failures - 1))
+        else:
+            self.failures = 0
+            if outcome == "applied":
+                self.interval = max(self.min_interval, self.interval * _SHRINK)
+            elif outcome in ("unchanged", "no_changes"):
+                self.interval = min(self.max_interval, self.interval * _GROW)
+            delay = self.interval
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run_once(self, force_reload: bool = False) -> SyncRun:
+        started_at, started = time.time(), time.monotonic()
+        changed, failed_sources, error = 0, 0, None
+        try:
+            result = await run_exclusive_sync(force_reload=force_reload)
+            if result is None:
+                outcome = "locked"
+            else:
+                outcome, changed, failed_sources = result.status, result.changed_users, result.failed_sources
+        except Exception as e:
+            outcome, error = "failed", repr(e)
+            logger.error(f"❌ Ошибка синхронизации: {e}")
+
+        run = SyncRun(started_at, time.monotonic() - started, outcome, changed, error)
+        run.next_in = self._next_delay(outcome, failed_sources)
+        self.history.append(run)
+        self.stats["runs"] += 1
+        if outcome == "applied":
+            self.stats["applied"] += 1
+        elif outcome in ("unchanged", "no_changes"):
+            self.stats["unchanged"] += 1
+        elif outcome == "locked":
+            self.stats["locked"] += 1
+        else:
+            self.stats["failed"] += 1
+        logger.info(
+            f"🔄 Синхронизация: {outcome} за {run.seconds:.2f} с"
+            + (f", изменено {changed}" if changed else "")
+            + f"; следующая через {run.next_in:.0f} с"
+        )
+        return run
+
+    def wake(self):
+        """Запускает синхронизацию сразу, не дожидаясь конца текущего интервала."""
+        self._wake.set()
+
+    async def run_forever(self):
+        while True:
+            run = await self.run_once()
+            # Сигнал, пришедший во время синхронизации, тоже не теряется
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=run.next_in)
+                self.stats["woken"] += 1
+                logger.info("⏰ Внеочередная синхронизация")
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def snapshot(self) -> dict:
+        last = self.history[-1] if self.history else None
+        return {
+            **self.stats,
+            "interval": self.interval,
+            "failures": self.failures,
+            "last": asdict(last) if last else None,
+            "history": [asdict(run) for run in self.history],
+        }
+
+
+sync_scheduler = SyncScheduler(
+    base=INTERVAL_SYNC,
+    min_interval=SYNC_INTERVAL_MIN,
+    max_interval=SYNC_INTERVAL_MAX,
+    backoff_max=SYNC_BACKOFF_MAX,
+    jitter=SYNC_JITTER,
+)
+
+
+def get_sync_scheduler_stats() -> dict:
+    return sync_scheduler.snapshot()
@@ -63,26 +63,56 @@ def render_welcome(full_name: str, role: str) -> str:
     return raw_template.format(ФИО=full_name_safe, role=role_safe)
 
 
+async def _read_text_block(filename: str) -> str | None:
+    filepath = os.path.join(BASE_PATH, filename)
+    try:
+        async with aiofiles.open(filepath, "r", encoding="utf-8") as f:
+            return await f.read()
+    except Exception as e:
+        logger.warning(f"❌ Ошибка при загрузке {filename}: {e}")
+        return None
+
+
 async def preload_text_blocks():
     """
     Асинхронно загружает все .md файлы из text_blocks в память (_text_blocks).
     """
     global _text_blocks
-    _text_blocks = {}
 
     if not os.path.isdir(BASE_PATH):
+        _text_blocks = {}
         logger.warning(f"❌ Каталог text_blocks не найден: {BASE_PATH}")
         return
 
+    blocks = {}
     for filename in os.listdir(BASE_PATH):
         if not filename.endswith(".md"):
             continue
+        content = await _read_text_block(filename)
+        if content is not None:
+            blocks[filename] = content
+            logger.info(f"📦 Загружен текстовый блок: {filename}")
+    _text_blocks = blocks
 
-        filepath = os.path.join(BASE_PATH, filename)
-        try:
-            async with aiofiles.open(filepath, "r", encoding="utf-8") as f:
-                content = await f.read()
-                _text_blocks[filename] = content
-                logger.info(f"📦 Загружен текстовый блок: {filename}")
-        except Exception as e:
-            logger.warning(f"❌ Ошибка при загрузке {filename}: {e}")
+
+async def reload_text_blocks(changed: set[str], removed: set[str]) -> list[str]:
+    """
+    Перечитывает только изменившиеся блоки и подменяет кеш целиком:
+    хендлер видит либо старую, либо новую версию, без промежуточного состояния.
+    Блок, который не удалось прочитать, остаётся в прошлой версии.
+
+    :return: имена файлов, которые действительно обновлены или удалены
+    """
+    global _text_blocks
+    blocks = dict(_text_blocks)
+    affected = []
+    for filename in sorted(changed):
+        content = await _read_text_block(filename)
+        if content is not None:
+            blocks[filename] = content
+            affected.append(filename)
+    for filename in sorted(removed):
+        if blocks.pop(filename, None) is not None:
+            affected.append(filename)
+    _text_blocks = blocks
+    return affected